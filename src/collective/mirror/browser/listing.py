@@ -0,0 +1,46 @@
+from collective.mirror.listing import get_listing
+from collective.mirror.mirror import mirror_info
+from collective.mirror.mirror import NOT_MIRRORED
+from plone import api
+from plone.app.contentlisting.browser import FolderListing
+from plone.app.contentlisting.interfaces import IContentListing
+
+
+POSITION_INDEX = 'getObjPositionInParent'
+
+
+class MirrorFolderListing(FolderListing):
+    """Folder listing of mirrored containers, served from the shared listings.
+
+    Folder views such as Plone's listing_view get their items from this. Listings
+    in a mirrored tree are computed once for the master and all mirrors, see
+    get_listing, and the items' catalog records at the requested location are then
+    looked up by path. Queries with criteria other than the portal type, or sorted
+    otherwise than by position, are passed to the catalog as usual.
+
+    """
+
+    def __call__(self, batch=False, b_size=20, b_start=0, orphan=0, **kw):
+        if (
+            set(kw) - {'portal_type', 'sort_on'}
+            or kw.get('sort_on', POSITION_INDEX) != POSITION_INDEX
+            or mirror_info(self.context, include_self=True) == NOT_MIRRORED
+        ):
+            return super().__call__(
+                batch=batch, b_size=b_size, b_start=b_start, orphan=orphan, **kw
+            )
+
+        portal_types = kw.get('portal_type')
+        if isinstance(portal_types, str):
+            portal_types = [portal_types]
+
+        cat = api.portal.get_tool('portal_catalog')
+        catalog = cat._catalog
+        brains = []
+        for item in get_listing(self.context):
+            if portal_types and item['portal_type'] not in portal_types:
+                continue
+            rid = catalog.uids.get(item['path'])
+            if rid is not None:
+                brains.append(catalog[rid])
+        return IContentListing(brains)
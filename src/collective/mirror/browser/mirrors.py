@@ -0,0 +1,90 @@
+from Acquisition import aq_base
+from collective.mirror.cache import tree_version
+from collective.mirror.cache import VersionedLRUCache
+from collective.mirror.mirror import attach_mirrors
+from collective.mirror.mirror import get_objects
+from collective.mirror.mirror import IMirror
+from collective.mirror.mirror import MASTER_TYPES
+from collective.mirror.mirror import mirror_info
+from collective.mirror.mirror import MIRRORS_ATTR
+from collective.mirror.mirror import NOT_MIRRORED
+from plone import api
+from plone.protect import CheckAuthenticator
+from Products.Five.browser import BrowserView
+from zExceptions import NotFound
+
+
+# UUIDs of the mirrors attached to any master, per portal.
+attached_cache = VersionedLRUCache(100)
+
+
+def attached_mirror_ids():
+    """Return the UUIDs of all mirrors in the portal that are attached to a master.
+
+    The mirrors are loaded in one batch, and the result is cached until any mirror is
+    attached or detached.
+
+    """
+    portal = api.portal.get()
+    key = '/'.join(portal.getPhysicalPath())
+    version = tree_version()
+    attached = attached_cache.get(key, version)
+    if attached is None:
+        cat = api.portal.get_tool('portal_catalog')
+        brains = cat.unrestrictedSearchResults(portal_type='mirror')
+        attached = frozenset(
+            brain.UID
+            for brain, mirror in zip(brains, get_objects(brains, restricted=False))
+            if getattr(aq_base(mirror), MIRRORS_ATTR, None)
+        )
+        attached_cache.set(key, version, attached)
+    return attached
+
+
+class AttachMirrorsView(BrowserView):
+    """Attach any number of unattached mirrors to the context folder at once.
+
+    Only folders that may be masters and are neither mirrors nor part of a mirrored
+    content tree can have mirrors attached. Mirrors that are attached to a master
+    already are left alone. Attaching and indexing is done in the request's own
+    transaction, so a conflict retry attaches the same mirrors again.
+
+    """
+
+    def __call__(self):
+        if not self.available():
+            raise NotFound(self.context, 'attach-mirrors', self.request)
+
+        form = self.request.form
+        if self.request.method == 'POST' and 'form.submitted' in form:
+            CheckAuthenticator(self.request)
+            uids = form.get('mirrors', [])
+            cat = api.portal.get_tool('portal_catalog')
+            brains = cat(portal_type='mirror', UID=uids) if uids else []
+            mirrors = [
+                mirror for mirror in get_objects(brains) if mirror.master is None
+            ]
+            count = attach_mirrors(self.context, mirrors)
+            api.portal.show_message(
+                f'Attached {len(mirrors)} mirrors, {count} catalog records written.',
+                request=self.request,
+            )
+            return self.request.response.redirect(self.context.absolute_url())
+
+        return self.index()
+
+    def available(self):
+        return (
+            self.context.portal_type in MASTER_TYPES
+            and not IMirror.providedBy(self.context)
+            and mirror_info(self.context) == NOT_MIRRORED
+        )
+
+    def candidates(self):
+        cat = api.portal.get_tool('portal_catalog')
+        attached = attached_mirror_ids()
+        return [
+            brain
+            for brain in cat(portal_type='mirror', sort_on='path')
+            if brain.UID not in attached
+        ]
@@ -0,0 +1,64 @@
+from BTrees.OOBTree import OOBTree
+from collective.mirror.sitemap import iter_links
+from plone import api
+from plone.app.layout.sitemap.sitemap import SiteMapView
+from Products.CMFCore.utils import getToolByName
+from Products.CMFPlone.interfaces import IPloneSiteRoot
+
+
+class MirrorSiteMapView(SiteMapView):
+    """Plone's gzipped sitemap of a navigation root, including mirrored content.
+
+    Only the objects listed differ from Plone's sitemap, rendering and caching are
+    Plone's. Master folders may lie outside the navigation root, so the whole site is
+    searched and links are filtered by path; see iter_links for how mirrored content
+    is covered.
+
+    """
+
+    def objects(self):
+        root = '/'.join(self.context.getPhysicalPath())
+        utils = getToolByName(self.context, 'plone_utils')
+        query = {
+            'path': '/'.join(api.portal.get().getPhysicalPath()),
+            'portal_type': utils.getUserFriendlyTypes(),
+        }
+        types_use_view_action = frozenset(
+            api.portal.get_registry_record(
+                'plone.types_use_view_action_in_listings', default=[]
+            )
+        )
+
+        default_page_modified = OOBTree()
+        for link in self._links(root, is_default_page=True, **query):
+            key = link.url.rsplit('/', 1)[0]
+            default_page_modified[key] = _modified(link.modified)
+
+        # The plone site root is not catalogued.
+        if IPloneSiteRoot.providedBy(self.context):
+            loc = self.context.absolute_url()
+            modified = _modified(self.context.modified())
+            default_modified = default_page_modified.get(loc, None)
+            if default_modified is not None:
+                modified = max(modified, default_modified)
+            yield {'loc': loc, 'lastmod': modified[1]}
+
+        for link in self._links(root, is_default_page=False, **query):
+            loc = link.url
+            modified = _modified(link.modified)
+            default_modified = default_page_modified.get(loc, None)
+            if default_modified is not None:
+                modified = max(modified, default_modified)
+            if link.portal_type in types_use_view_action:
+                loc += '/view'
+            yield {'loc': loc, 'lastmod': modified[1]}
+
+    def _links(self, root, **query):
+        for link in iter_links(**query):
+            if link.path == root or link.path.startswith(root + '/'):
+                yield link
+
+
+def _modified(date):
+    # Comparison must be on GMT value
+    return (date.micros(), date.ISO8601())
@@ -0,0 +1,120 @@
+"""Process-wide caching of mirror lookups."""
+
+from Acquisition import aq_base
+from BTrees.Length import Length
+from collections import OrderedDict
+from plone import api
+from zope.annotation.interfaces import IAnnotations
+
+import threading
+import transaction
+
+
+VERSION_KEY = 'collective.mirror.tree_version'
+
+CONTENT_VERSION_KEY = 'collective.mirror.content_version'
+
+# Key of the counters bumped by a transaction in its data.
+_bumped_marker = object()
+
+
+def tree_version():
+    """Return a counter that changes whenever mirrored trees change their shape.
+
+    The counter is stored persistently with the portal, so it is updated in all
+    processes through ZODB invalidations.
+
+    While the current transaction has bumped the counter, None is returned, which
+    caches treat as not cacheable: the transaction may still be aborted, and another
+    transaction could then commit a different change that reaches the same value.
+
+    """
+    portal = api.portal.get()
+    if ('tree', id(aq_base(portal))) in _bumped():
+        return None
+    counter = IAnnotations(portal).get(VERSION_KEY)
+    return counter() if counter is not None else 0
+
+
+def bump_tree_version():
+    """Invalidate cached lookups, e.g. after attaching or detaching mirrors."""
+    portal = api.portal.get()
+    _bumped().add(('tree', id(aq_base(portal))))
+    annotations = IAnnotations(portal)
+    counter = annotations.get(VERSION_KEY)
+    if counter is None:
+        counter = annotations[VERSION_KEY] = Length()
+    counter.change(1)
+
+
+def content_version(master):
+    """Return a counter that changes whenever any content in a master's tree changes.
+
+    The counter is stored persistently with the master, see tree_version.
+
+    """
+    if ('content', id(aq_base(master))) in _bumped():
+        return None
+    counter = IAnnotations(master).get(CONTENT_VERSION_KEY)
+    return counter() if counter is not None else 0
+
+
+def bump_content_version(master):
+    """Invalidate cached data about a master's tree, e.g. after modifying its content.
+
+    Concurrent changes within the same tree don't conflict over the counter.
+
+    """
+    _bumped().add(('content', id(aq_base(master))))
+    annotations = IAnnotations(master)
+    counter = annotations.get(CONTENT_VERSION_KEY)
+    if counter is None:
+        counter = annotations[CONTENT_VERSION_KEY] = Length()
+    counter.change(1)
+
+
+def _bumped():
+    """Return the counters bumped by the current transaction, savepoints or not."""
+    txn = transaction.get()
+    try:
+        return txn.data(_bumped_marker)
+    except KeyError:
+        bumped = set()
+        txn.set_data(_bumped_marker, bumped)
+        return bumped
+
+
+class VersionedLRUCache:
+    """Bounded mapping whose entries are only valid for the version they were set at.
+
+    Entries set at another version are treated as missing, and eventually dropped as
+    the least recently used ones. A version of None means the data isn't cacheable, so
+    nothing is found or stored for it.
+
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or version is None or entry[0] != version:
+                return default
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, value):
+        if version is None:
+            return
+        with self._lock:
+            self._data[key] = (version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
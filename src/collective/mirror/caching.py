@@ -0,0 +1,95 @@
+from .mirror import get_tree_paths
+from .mirror import mirror_info
+from .mirror import NOT_MIRRORED
+from Acquisition import aq_parent
+from plone.dexterity.interfaces import IDexterityContent
+from plone.uuid.interfaces import IUUID
+from Products.CMFDynamicViewFTI.interfaces import IBrowserDefault
+from z3c.caching.interfaces import IPurgePaths
+from zope.annotation.interfaces import IAnnotations
+from zope.component import adapter
+from zope.globalrequest import getRequest
+from zope.interface import implementer
+
+
+TREE_PATHS_KEY = 'collective.mirror.purge_tree_paths'
+
+
+def cached_tree_paths(info, request):
+    """Look up the locations of a mirrored tree once per request (and transaction).
+
+    Many objects inside the same tree are usually purged together, e.g. when a folder
+    gets moved or a workflow transition is applied to a batch of items.
+
+    """
+    cache = (
+        IAnnotations(request).setdefault(TREE_PATHS_KEY, {})
+        if request is not None
+        else {}
+    )
+    key = (IUUID(info.master), tuple(info.mirror_ids))
+    if key not in cache:
+        cache[key] = get_tree_paths(info)
+    return cache[key]
+
+
+@implementer(IPurgePaths)
+@adapter(IDexterityContent)
+class MirrorPurgePaths:
+    """Purge the copies of mirrored content at all other mirror (or master) locations.
+
+    plone.app.caching only purges the paths of an object as seen at the location where
+    it was changed. Since the content is shared by the master and all of its mirrors, we
+    re-base the object's path and that of its parent onto all the other locations of
+    the tree. The locations are taken from the catalog records of master and mirrors,
+    so no copy needs to be woken up.
+
+    Paths are queued by plone.cachepurging into a set kept on the request, so each path
+    is purged only once per transaction.
+
+    """
+
+    def __init__(self, context):
+        self.context = context
+
+    def getRelativePaths(self):
+        info = mirror_info(self.context)
+        if info == NOT_MIRRORED:
+            return []
+
+        request = getRequest()
+        tree_paths = cached_tree_paths(info, request)
+        own_tree_id = IUUID(info.mirror if info.mirror is not None else info.master)
+        own_tree_path = tree_paths.get(own_tree_id)
+        if own_tree_path is None:
+            return []
+
+        start = len(own_tree_path)
+        obj_path = '/'.join(self.context.getPhysicalPath())[start:]
+        parent_path = '/'.join(aq_parent(self.context).getPhysicalPath())[start:]
+        obj_suffixes = ['', '/', '/view']
+        browser_default = IBrowserDefault(self.context, None)
+        if browser_default is not None and (layout := browser_default.getLayout()):
+            obj_suffixes.append(f'/{layout}')
+        parent_suffixes = ['', '/', '/view']
+
+        paths = {}
+        for tree_id, tree_path in tree_paths.items():
+            if tree_id == own_tree_id:
+                continue
+            for path, suffixes in (
+                (obj_path, obj_suffixes),
+                (parent_path, parent_suffixes),
+            ):
+                prefix = self._virtual_path(tree_path + path, request)
+                for suffix in suffixes:
+                    paths[prefix + suffix] = None
+        return list(paths)
+
+    def getAbsolutePaths(self):
+        return []
+
+    def _virtual_path(self, path, request):
+        if request is None:
+            return path
+        return '/' + '/'.join(request.physicalPathToVirtualPath(path.split('/')))
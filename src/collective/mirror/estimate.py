@@ -0,0 +1,69 @@
+"""Dry-run estimates of the catalog work done by expensive mirror operations.
+
+Estimates are informational, e.g. for scheduling heavy operations off-peak; they don't
+change how any operation runs.
+
+"""
+
+from .mirror import mirror_info
+from .mirror import record_cost
+from collections import namedtuple
+from plone import api
+
+
+Estimate = namedtuple(
+    'Estimate', ('objects', 'records_added', 'records_removed', 'seconds')
+)
+
+
+def count_below(obj):
+    """Count the catalog records below an object without waking up any objects."""
+    cat = api.portal.get_tool('portal_catalog')
+    path = '/'.join(obj.getPhysicalPath())
+    return max(len(cat.unrestrictedSearchResults(path=path)) - 1, 0)
+
+
+def locations(obj, include_self=False):
+    """Count the locations at which an object's content is cataloged."""
+    mirror_ids = mirror_info(obj, include_self=include_self).mirror_ids
+    return 1 + len(mirror_ids or ())
+
+
+def estimate(objects, records_added, records_removed):
+    """Estimate the time for adding and removing records from costs measured so far."""
+    return Estimate(
+        objects,
+        records_added,
+        records_removed,
+        records_added * record_cost('add') + records_removed * record_cost('remove'),
+    )
+
+
+def estimate_attach(mirror, master):
+    """Estimate attaching a mirror to a master, possibly replacing its current one."""
+    objects = count_below(master)
+    removed = count_below(mirror) if mirror.master is not None else 0
+    return estimate(objects, objects, removed)
+
+
+def estimate_detach(mirror):
+    """Estimate detaching a mirror from its master."""
+    objects = count_below(mirror) if mirror.master is not None else 0
+    return estimate(objects, 0, objects)
+
+
+def estimate_move(obj, target):
+    """Estimate moving an object and its content into a target folder."""
+    objects = count_below(obj) + 1
+    return estimate(
+        objects,
+        objects * locations(target, include_self=True),
+        objects * locations(obj),
+    )
+
+
+def estimate_delete(obj):
+    """Estimate deleting an object, which may be a master folder, and its content."""
+    below = count_below(obj)
+    removed = below * locations(obj, include_self=True) + locations(obj)
+    return estimate(below + 1, 0, removed)
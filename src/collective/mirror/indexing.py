@@ -0,0 +1,252 @@
+"""Selection of the indexes and metadata maintained for mirrored content."""
+
+from .mirror import IMirror
+from .mirror import MIRRORED_INDEX
+from .mirror import MIRRORS_ATTR
+from Acquisition import aq_base
+from Acquisition import aq_chain
+from plone import api
+from plone.dexterity.interfaces import IDexterityContent
+from plone.indexer import indexer
+from plone.indexer.interfaces import IIndexableObject
+from plone.indexer.wrapper import IndexableObjectWrapper
+from plone.uuid.interfaces import IUUID
+from Products.CMFCore.interfaces import ISiteRoot
+from Products.CMFPlone.interfaces import IPloneCatalogTool
+from zope.component import adapter
+from zope.interface import implementer
+
+import transaction
+
+
+INDEXES_RECORD = 'collective.mirror.mirror_indexes'
+
+METADATA_RECORD = 'collective.mirror.mirror_metadata'
+
+# Lookups, positions, security checks and the effective range filter rely on these for
+# mirrored copies.
+REQUIRED = frozenset(
+    (
+        'UID',
+        'allowedRolesAndUsers',
+        'effective',
+        'effectiveRange',
+        'expires',
+        'getId',
+        'getObjPositionInParent',
+        'id',
+        MIRRORED_INDEX,
+        'object_provides',
+        'path',
+        'portal_type',
+        'review_state',
+    )
+)
+
+
+def mirror_indexes():
+    """Return the names of indexes maintained for mirrored copies, None for all."""
+    names = api.portal.get_registry_record(INDEXES_RECORD, default=None)
+    return REQUIRED.union(names) if names else None
+
+
+def mirror_metadata():
+    """Return the names of metadata columns stored for mirrored copies, None for all."""
+    names = api.portal.get_registry_record(METADATA_RECORD, default=None)
+    return REQUIRED.union(names) if names else None
+
+
+def _index_sources(catalog, indexes):
+    kept, excluded = set(), set()
+    for index in catalog._catalog.indexes.values():
+        sources = index.getIndexSourceNames()
+        if indexes is None or index.getId() in indexes:
+            kept.update(sources)
+        else:
+            excluded.update(sources)
+    return kept, excluded
+
+
+def hidden_columns(catalog):
+    """Return the attributes to hide from the catalog's metadata for mirrored copies.
+
+    Attributes that maintained indexes are computed from are never hidden, so they may
+    be stored as metadata even if not selected.
+
+    """
+    metadata = mirror_metadata()
+    if metadata is None:
+        return frozenset()
+    kept_sources = _index_sources(catalog, mirror_indexes())[0]
+    return frozenset(set(catalog.schema()) - metadata - kept_sources - REQUIRED)
+
+
+def hidden_attributes(catalog):
+    """Return the attributes to hide from the catalog when indexing mirrored copies.
+
+    This is used when the catalog indexes a copy in all its indexes, e.g. when it is
+    re-indexed after a modification or the catalog is rebuilt. Attributes are hidden
+    only if neither a maintained index nor a stored metadata column needs them, so an
+    excluded index whose attribute is also a stored column is still maintained.
+
+    """
+    indexes, metadata = mirror_indexes(), mirror_metadata()
+    kept_sources, excluded_sources = _index_sources(catalog, indexes)
+    columns = set(catalog.schema()) if metadata is None else metadata
+    hidden = excluded_sources - kept_sources - columns
+    return frozenset(hidden.union(hidden_columns(catalog)) - REQUIRED)
+
+
+# Key of the attributes hidden per catalog in a transaction's data.
+_hidden_marker = object()
+
+
+def transaction_hidden_attributes(catalog):
+    """Return hidden_attributes for a catalog, computed once per transaction.
+
+    So cataloging many objects in one operation, such as rebuilding the catalog,
+    doesn't look up the selection for each of them. See selection_changed.
+
+    """
+    txn = transaction.get()
+    try:
+        cached = txn.data(_hidden_marker)
+    except KeyError:
+        cached = {}
+        txn.set_data(_hidden_marker, cached)
+    key = id(aq_base(catalog))
+    if key not in cached:
+        cached[key] = hidden_attributes(catalog)
+    return cached[key]
+
+
+def selection_changed(event):
+    """Drop the current transaction's selection when the configured one changes."""
+    if event.record.__name__ not in (INDEXES_RECORD, METADATA_RECORD):
+        return
+    try:
+        transaction.get().data(_hidden_marker).clear()
+    except KeyError:
+        pass
+
+
+class CopyCataloger:
+    """Catalog mirrored copies in the indexes and metadata maintained for them.
+
+    Indexes are selected by passing them to the catalog, and metadata columns by
+    hiding the attributes of those not stored, so the two selections don't interfere.
+    The selection is looked up once, so this is meant to be used for one operation.
+
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        indexes = mirror_indexes()
+        self.idxs = (
+            []
+            if indexes is None
+            else [name for name in catalog.indexes() if name in indexes]
+        )
+        self.hidden = hidden_columns(catalog)
+
+    def __call__(self, obj, path):
+        wrapper = IndexableObjectWrapper(obj, self.catalog)
+        if self.hidden:
+            wrapper = MirrorIndexableObject(wrapper, self.hidden)
+        self.catalog.catalog_object(wrapper, path, idxs=self.idxs)
+
+
+@implementer(IIndexableObject)
+class MirrorIndexableObject:
+    """Indexable object that hides some of the wrapped object's attributes.
+
+    The catalog doesn't index attributes an object doesn't have, and stores missing
+    values in their metadata columns.
+
+    """
+
+    def __init__(self, wrapped, hidden):
+        self._wrapped = wrapped
+        self._hidden = hidden
+
+    def __getattr__(self, name):
+        if name in self._hidden:
+            raise AttributeError(name)
+        return getattr(self._wrapped, name)
+
+
+@implementer(IIndexableObject)
+@adapter(IDexterityContent, IPloneCatalogTool)
+def mirror_indexable_object(obj, catalog):
+    """Restrict the indexes and metadata of mirrored copies to those configured.
+
+    Since this applies whenever mirrored copies are cataloged, it is respected by
+    re-indexing after modifications, attaching mirrors and rebuilding the catalog.
+    Like is_mirrored, this doesn't depend on the add-on's browser layer, so scripts
+    catalog copies the same way.
+
+    """
+    wrapper = IndexableObjectWrapper(obj, catalog)
+    if not _in_mirror(obj):
+        return wrapper
+    if hidden := transaction_hidden_attributes(catalog):
+        return MirrorIndexableObject(wrapper, hidden)
+    return wrapper
+
+
+def _in_mirror(obj):
+    """Tell whether an object is located in an attached mirror, see mirror_info."""
+    for element in aq_chain(obj)[1:]:
+        if ISiteRoot.providedBy(element):
+            break
+        if getattr(aq_base(element), MIRRORS_ATTR, None):
+            return IMirror.providedBy(element)
+    return False
+
+
+@indexer(IDexterityContent)
+def is_mirrored(obj):
+    """Tell whether an object is a mirror or belongs to a master's or mirror's tree.
+
+    Unlike mirror_info, this doesn't depend on the add-on's browser layer, so content
+    is indexed the same way by scripts.
+
+    """
+    if IMirror.providedBy(obj):
+        return True
+    for element in aq_chain(obj)[1:]:
+        if ISiteRoot.providedBy(element):
+            break
+        if getattr(element, MIRRORS_ATTR, ()):
+            return True
+    return False
+
+
+def search_in_tree(target, **query):
+    """Search the content tree of a master or mirror folder.
+
+    Query parameters for indexes that aren't maintained for mirrored copies, such as
+    SearchableText, are evaluated against the master's content, and the hits are mapped
+    back to their copies inside the mirror. Note that sorting on such indexes is not
+    supported, and that results are then sorted by the other parameters only.
+
+    """
+    cat = api.portal.get_tool('portal_catalog')
+    query['path'] = '/'.join(target.getPhysicalPath())
+    if not IMirror.providedBy(target) or target.master is None:
+        return cat(**query)
+
+    indexes = mirror_indexes()
+    excluded = {
+        name: query.pop(name)
+        for name in list(query)
+        if indexes is not None and name not in indexes and name in cat.indexes()
+    }
+    if not excluded:
+        return cat(**query)
+
+    master_path = '/'.join(target.master.getPhysicalPath())
+    hits = cat.unrestrictedSearchResults(path=master_path, **excluded)
+    mirror_id = IUUID(target)
+    query['UID'] = [f'{brain.UID}@{mirror_id}' for brain in hits]
+    return cat(**query)
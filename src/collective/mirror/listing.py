@@ -0,0 +1,156 @@
+"""Folder listings shared by a master folder and all of its mirrors."""
+
+from .cache import bump_content_version
+from .cache import content_version
+from .cache import VersionedLRUCache
+from .mirror import IMirror
+from .mirror import mirror_info
+from .mirror import MIRRORS_ATTR
+from .mirror import NOT_MIRRORED
+from Acquisition import aq_base
+from Acquisition import aq_chain
+from DateTime import DateTime
+from plone import api
+from plone.uuid.interfaces import IUUID
+from Products.CMFCore.interfaces import ISiteRoot
+
+
+LISTING_CACHE_SIZE = 1000
+
+listing_cache = VersionedLRUCache(LISTING_CACHE_SIZE)
+
+
+def get_listing(container):
+    """Return data about the items of a container that the current user may view.
+
+    Master and mirrors share their content and ordering, so the listing of a container
+    in a mirrored tree is computed once and re-based onto the location it is requested
+    for: URLs, paths and UIDs are those of the copies at that location.
+
+    Cached listings are keyed by the master's tree, the container's path within the
+    tree, the current user's roles and the security settings of the mirror (or master)
+    at the requested location. They are invalidated by any change to the content of the
+    master's tree, see invalidate_listings. Items that aren't effective yet or have
+    expired are filtered out on each request, unless the user may see inactive content.
+
+    """
+    path = '/'.join(container.getPhysicalPath())
+    info = mirror_info(container, include_self=True)
+    if info == NOT_MIRRORED:
+        items = _query_listing(path)
+        return _rebase(_active(items, path), container, path, None)
+
+    root_path = '/'.join(_tree_root(container).getPhysicalPath())
+    start = len(root_path)
+    cat = api.portal.get_tool('portal_catalog')
+    key = (
+        '/'.join(api.portal.get().getPhysicalPath()),
+        info.master._p_oid,
+        path[start:],
+        _allowed_roles_and_users(cat, root_path),
+        tuple(sorted(cat._listAllowedRolesAndUsers(api.user.get_current()))),
+    )
+    version = content_version(info.master)
+    items = listing_cache.get(key, version)
+    if items is None:
+        items = _query_listing(path)
+        listing_cache.set(key, version, items)
+
+    mirror_id = IUUID(info.mirror) if info.mirror is not None else None
+    return _rebase(_active(items, path), container, path, mirror_id)
+
+
+def invalidate_listings(obj, event):
+    """Invalidate the cached listings of the trees that content is changed in.
+
+    This doesn't depend on the add-on's browser layer, so changes made by scripts
+    invalidate listings as well.
+
+    """
+    if aq_base(obj) is not aq_base(event.object):
+        return
+
+    masters = {}
+    for element in (
+        getattr(event, 'oldParent', None),
+        getattr(event, 'newParent', None),
+        obj,
+    ):
+        if element is not None and (master := _master_of(element)) is not None:
+            masters[id(aq_base(master))] = master
+    for master in masters.values():
+        bump_content_version(master)
+
+
+def _master_of(obj):
+    for element in aq_chain(obj):
+        if ISiteRoot.providedBy(element):
+            break
+        if getattr(aq_base(element), MIRRORS_ATTR, None):
+            return element.master if IMirror.providedBy(element) else element
+
+
+def _tree_root(container):
+    for element in aq_chain(container):
+        if getattr(aq_base(element), MIRRORS_ATTR, None):
+            return element
+
+
+def _allowed_roles_and_users(cat, path):
+    rid = cat._catalog.uids.get(path)
+    if rid is None:
+        return ()
+    index = cat._catalog.getIndex('allowedRolesAndUsers')
+    return tuple(sorted(index.getEntryForObject(rid, default=None) or ()))
+
+
+def _query_listing(path):
+    cat = api.portal.get_tool('portal_catalog')
+    brains = cat(
+        path={'query': path, 'depth': 1},
+        sort_on='getObjPositionInParent',
+        show_inactive=True,
+    )
+    return [
+        {
+            'id': brain.getId,
+            'title': brain.Title,
+            'description': brain.Description,
+            'portal_type': brain.portal_type,
+            'review_state': brain.review_state,
+            'is_folderish': brain.is_folderish,
+            'exclude_from_nav': brain.exclude_from_nav,
+            'effective': brain.effective or None,
+            'expires': brain.expires or None,
+            'bare_uid': brain.UID.split('@')[0],
+        }
+        for brain in brains
+    ]
+
+
+def _active(items, path):
+    """Filter out items outside their effective range, like the catalog would."""
+    cat = api.portal.get_tool('portal_catalog')
+    if cat.allow_inactive({'path': path}):
+        return items
+
+    now = DateTime()
+    return [
+        item
+        for item in items
+        if (item['effective'] is None or item['effective'] <= now)
+        and (item['expires'] is None or now <= item['expires'])
+    ]
+
+
+def _rebase(items, container, path, mirror_id):
+    url = container.absolute_url()
+    return [
+        dict(
+            item,
+            url=f'{url}/{item["id"]}',
+            path=f'{path}/{item["id"]}',
+            UID=f'{item["bare_uid"]}@{mirror_id}' if mirror_id else item['bare_uid'],
+        )
+        for item in items
+    ]
@@ -1,29 +1,31 @@
+from .cache import bump_tree_version
+from .cache import tree_version
+from .cache import VersionedLRUCache
 from .interfaces import ICollectiveMirrorLayer
+from .ordering import MergingOrder
+from .ordering import MirrorOrdering
+from .ordering import ORDERING_NAME
 from Acquisition import aq_base
 from Acquisition import aq_chain
 from Acquisition import aq_parent
 from collections import namedtuple
 from logging import getLogger
 from OFS.interfaces import IObjectWillBeAddedEvent
+from OFS.interfaces import IObjectWillBeRemovedEvent
 from persistent.list import PersistentList
 from plone import api
 from plone.app.layout.navigation.interfaces import INavigationRoot
-from plone.app.multilingual.dx.language import Language
-from plone.app.multilingual.interfaces import ITG
-from plone.app.multilingual.interfaces import ITranslatable
-from plone.app.multilingual.itg import attributeTG
-from plone.app.vocabularies.catalog import CatalogVocabulary
-from plone.app.vocabularies.utils import parseQueryString
-from plone.app.z3cform.widget import RelatedItemsFieldWidget
 from plone.autoform import directives
 from plone.dexterity.content import Container
 from plone.dexterity.interfaces import IDexterityContent
+from plone.folder.interfaces import IExplicitOrdering
 from plone.supermodel import model
 from plone.uuid.adapter import attributeUUID
 from plone.uuid.interfaces import IAttributeUUID
 from plone.uuid.interfaces import IUUID
+from Products.CMFCore.indexing import processQueue
+from Products.CMFCore.interfaces import IFolderish
 from Products.CMFCore.interfaces import ISiteRoot
-from Products.CMFPlone.interfaces import ILanguage
 from Products.CMFPlone.interfaces import IPloneSiteRoot
 from z3c.relationfield import RelationChoice
 from z3c.relationfield.relation import RelationValue
@@ -31,17 +33,39 @@ from zope.annotation.interfaces import IAnnotations
 from zope.component import adapter
 from zope.component import getSiteManager
 from zope.component import getUtility
+from zope.event import notify
 from zope.globalrequest import getRequest
 from zope.interface import implementer
 from zope.intid.interfaces import IIntIds
+from zope.lifecycleevent import Attributes
+from zope.lifecycleevent import ObjectModifiedEvent
+from zope.lifecycleevent.interfaces import IObjectAddedEvent
 from zope.lifecycleevent.interfaces import IObjectRemovedEvent
 from zope.location.interfaces import LocationError
-from zope.schema.interfaces import IVocabularyFactory
+
+import time
+import transaction
 
 
 logger = getLogger(__name__)
 
 
+# Types that may be picked as master folders.
+MASTER_TYPES = ('Folder',)
+
+# Index telling whether content belongs to a mirrored tree, see indexing.is_mirrored.
+MIRRORED_INDEX = 'is_mirrored'
+
+
+class MirrorNotFound(LookupError):
+    """No mirror (or master) of a tree can be found by navigation root.
+
+    This happens if none of the tree's locations visible to the current user shares a
+    navigation root with the target.
+
+    """
+
+
 class IMirror(model.Schema):
 
     master_rel = RelationChoice(
@@ -51,9 +75,9 @@ class IMirror(model.Schema):
     )
     directives.widget(
         'master_rel',
-        RelatedItemsFieldWidget,
+        'plone.app.z3cform.widget.RelatedItemsFieldWidget',
         pattern_options={
-            'selectableTypes': ['Folder'],
+            'selectableTypes': list(MASTER_TYPES),
         },
     )
 
@@ -64,6 +88,28 @@ NOT_MIRRORED = MirrorInfo(None, None, None)
 
 MIRRORS_ATTR = '_collective_mirrors'
 
+PLACELESS_CACHE_SIZE = 10000
+
+placeless_info_cache = VersionedLRUCache(PLACELESS_CACHE_SIZE)
+
+_marker = object()
+
+# Catalog records written (add) or removed and the seconds that took in this process,
+# starting from a rough prior guess.
+record_costs = {'add': [100, 0.5], 'remove': [100, 0.1]}
+
+
+def record_cost(kind):
+    """Return the average number of seconds it takes to add or remove a record."""
+    records, seconds = record_costs[kind]
+    return seconds / records
+
+
+def measure_records(kind, records, start):
+    if records:
+        record_costs[kind][0] += records
+        record_costs[kind][1] += time.time() - start
+
 
 def ensure_mirrors_attr(master):
     mirrors = getattr(master, MIRRORS_ATTR, None)
@@ -96,9 +142,8 @@ class Mirror(Container):
         self._tree = master._tree
         self._count = master._count
         self._mt_index = master._mt_index
-        ordering = self.getOrdering()
-        ordering._set_order(master.getOrdering()._order(create=True))
-        IAnnotations(self)[ordering.POS_KEY] = master.getOrdering()._pos(create=True)
+        self._ordering = ORDERING_NAME
+        IAnnotations(self)[MirrorOrdering.ORDER_KEY] = share_order(master)
 
         mirrors = ensure_mirrors_attr(master)
         setattr(aq_base(self), MIRRORS_ATTR, mirrors)
@@ -108,24 +153,37 @@ class Mirror(Container):
         except TypeError:
             # self cannot yet be adapted to IUUID while being added
             pass
+        else:
+            if len(mirrors) == 1:
+                reindex_mirrored(master)
+
+        bump_tree_version()
+
+    def _switch(self, master):
+        """Replace the master without touching the catalog, except for is_mirrored."""
+        self._leave_master()
+        self._master = RelationValue(getUtility(IIntIds).getId(master))
+        self._attach(master)
 
-    def _detach(self):
+    def _detach(self, reindex=True):
         cat = api.portal.get_tool('portal_catalog')
         prefix = cat.unrestrictedSearchResults(UID=IUUID(self))[0].getPath()
-        content_brains = cat.unrestrictedSearchResults(path=prefix)
-        for brain in content_brains:
-            if brain.getPath() != prefix:
-                brain.getObject().unindexObject()
+        uncatalog_subtree(prefix)
 
         self._tree = {}
         self._count = None
         self._mt_index = {}
-        ordering = self.getOrdering()
-        ordering._set_order([])
-        IAnnotations(self)[ordering.POS_KEY] = {}
+        IAnnotations(self)[MirrorOrdering.ORDER_KEY] = MergingOrder()
 
-        getattr(self, MIRRORS_ATTR).remove(IUUID(self))
+        self._leave_master(reindex)
         setattr(self, MIRRORS_ATTR, [])
+        bump_tree_version()
+
+    def _leave_master(self, reindex=True):
+        mirrors = getattr(self, MIRRORS_ATTR)
+        mirrors.remove(IUUID(self))
+        if not mirrors and reindex:
+            reindex_mirrored(self.master)
 
     @property
     def master(self):
@@ -144,10 +202,219 @@ class Mirror(Container):
         return get_object_in_tree(obj, self)
 
 
+def uncatalog_subtree(prefix):
+    """Remove all catalog records below a path in one pass over the catalog.
+
+    The objects are neither woken up nor notified, so this doesn't trigger any event
+    handlers for each of them.
+
+    """
+    start = time.time()
+    processQueue()
+    cat = api.portal.get_tool('portal_catalog')
+    paths = [brain.getPath() for brain in cat.unrestrictedSearchResults(path=prefix)]
+    paths = [path for path in paths if path != prefix]
+    for path in paths:
+        cat.uncatalog_object(path)
+    measure_records('remove', len(paths), start)
+
+
+MirroredRecord = namedtuple('MirroredRecord', (MIRRORED_INDEX,))
+
+
+def reindex_mirrored(master):
+    """Update the is_mirrored index for a master folder's content.
+
+    This is needed when a folder gains its first mirror or loses its last one. Only the
+    content located in the master is re-indexed, as the mirrors' records are written or
+    removed anyway.
+
+    The index values are derived from the records' paths and the locations of all
+    attached mirrors and their masters, the same way is_mirrored computes them from
+    the parent chain. So only the mirrors are woken up, not the content.
+
+    """
+    cat = api.portal.get_tool('portal_catalog')
+    index = cat._catalog.indexes.get(MIRRORED_INDEX)
+    if index is None:
+        return
+
+    processQueue()
+    prefix = '/'.join(master.getPhysicalPath())
+    mirror_brains = cat.unrestrictedSearchResults(portal_type='mirror')
+    mirror_paths = {brain.getPath() for brain in mirror_brains}
+    trees = {prefix} if getattr(aq_base(master), MIRRORS_ATTR, None) else set()
+    for brain, mirror in zip(
+        mirror_brains, get_objects(mirror_brains, restricted=False)
+    ):
+        if getattr(aq_base(mirror), MIRRORS_ATTR, None) and mirror.master is not None:
+            trees.add(brain.getPath())
+            trees.add('/'.join(mirror.master.getPhysicalPath()))
+
+    changed = False
+    for brain in cat.unrestrictedSearchResults(path=prefix):
+        path = brain.getPath()
+        if path == prefix:
+            continue
+        parts = path.split('/')
+        mirrored = path in mirror_paths or any(
+            '/'.join(parts[:end]) in trees for end in range(2, len(parts))
+        )
+        changed |= bool(index.index_object(brain.getRID(), MirroredRecord(mirrored)))
+
+    if changed:
+        cat._increment_counter()
+
+
+def attached_mirrors(master):
+    """Retrieve all mirrors attached to a master folder."""
+    mirror_ids = list(getattr(aq_base(master), MIRRORS_ATTR, ()))
+    if not mirror_ids:
+        return []
+
+    cat = api.portal.get_tool('portal_catalog')
+    brains = cat.unrestrictedSearchResults(UID=mirror_ids)
+    return get_objects(brains, restricted=False)
+
+
+def share_order(master):
+    """Switch a master folder to the ordering shared with its mirrors.
+
+    Return the master's order to be shared. The first time, the master's current order
+    is converted, and any mirrors attached earlier are made to share the new order.
+
+    """
+    annotations = IAnnotations(master)
+    order = annotations.get(MirrorOrdering.ORDER_KEY)
+    if master._ordering == ORDERING_NAME and isinstance(order, MergingOrder):
+        return order
+
+    order = MergingOrder(master.getOrdering().idsInOrder())
+    for folder in [master] + attached_mirrors(master):
+        folder._ordering = ORDERING_NAME
+        annotations = IAnnotations(folder)
+        annotations[MirrorOrdering.ORDER_KEY] = order
+        if MirrorOrdering.POS_KEY in annotations:
+            del annotations[MirrorOrdering.POS_KEY]
+    return order
+
+
+def attach_mirrors(master, mirrors, chunk_size=1000, commit=False):
+    """Attach a number of mirrors to a master folder and index their content.
+
+    The master's content tree is traversed only once, and each object is indexed for
+    all the new mirrors at the same time, see catalog_copies. Return the number of
+    catalog records written.
+
+    """
+    mirrors = list(mirrors)
+    for mirror in mirrors:
+        mirror.master = master
+        notify(ObjectModifiedEvent(mirror, Attributes(IMirror, 'master_rel')))
+    if not mirrors:
+        return 0
+
+    return len(catalog_copies(master, mirrors, chunk_size, commit))
+
+
+def swap_master(mirror, master, chunk_size=1000):
+    """Switch a mirror over to another master folder without the mirror going empty.
+
+    First, the new master's content is indexed as located in the mirror. Then the
+    mirror is switched to the new master in one go, and finally the catalog records of
+    content that only existed in the old master's tree are removed in bulk.
+
+    All of this happens in one transaction, with savepoints between chunks of indexing
+    as with attach_mirrors. So other requests keep seeing the mirror with the old
+    master's content and matching catalog records until the swap is committed, and a
+    failure leaves nothing half-swapped behind. Return the number of catalog records
+    written.
+
+    """
+    if mirror.master is None:
+        return attach_mirrors(master, [mirror], chunk_size)
+
+    cat = api.portal.get_tool('portal_catalog')
+    prefix = '/'.join(mirror.getPhysicalPath())
+    processQueue()
+    old_paths = {
+        brain.getPath() for brain in cat.unrestrictedSearchResults(path=prefix)
+    } - {prefix}
+
+    new_paths = catalog_copies(master, [mirror], chunk_size)
+
+    mirror._switch(master)
+    notify(ObjectModifiedEvent(mirror, Attributes(IMirror, 'master_rel')))
+
+    for path in old_paths.difference(new_paths):
+        cat.uncatalog_object(path)
+    return len(new_paths)
+
+
+def catalog_copies(master, roots, chunk_size=1000, commit=False):
+    """Catalog the content of a master's tree as located inside each of the roots.
+
+    The tree is traversed once, and each object is cataloged for all roots in turn. The
+    copies are wrapped in their parent copies directly rather than taken from the
+    roots' own content, so the roots need not share the master's content tree yet.
+
+    Every chunk_size objects, a savepoint is made or, if commit is true, the
+    transaction is committed. Return the paths of all catalog records written.
+
+    """
+    # Deferred as the indexing module builds on this one.
+    from .indexing import CopyCataloger
+
+    start = time.time()
+    cat = api.portal.get_tool('portal_catalog')
+    catalog_copy = CopyCataloger(cat)
+    paths = []
+    objects = 0
+    stack = [(master, list(roots))]
+    while stack:
+        container, copies = stack.pop()
+        for obj_id in container.objectIds():
+            obj = container._getOb(obj_id)
+            obj_copies = [aq_base(obj).__of__(copy) for copy in copies]
+            for copy in obj_copies:
+                path = '/'.join(copy.getPhysicalPath())
+                catalog_copy(copy, path)
+                paths.append(path)
+
+            if IFolderish.providedBy(obj):
+                stack.append((obj, obj_copies))
+
+            objects += 1
+            if objects % chunk_size == 0:
+                if commit:
+                    transaction.commit()
+                else:
+                    transaction.savepoint(optimistic=True)
+
+    measure_records('add', len(paths), start)
+    return paths
+
+
+def detach_mirrors(master, reindex=True):
+    """Detach all mirrors from a master folder, leaving them empty.
+
+    The mirrors' catalog records are removed in bulk, with one modified event being
+    notified per mirror rather than one event per mirrored object. Unless reindex is
+    false, the master's content is re-indexed as no longer mirrored afterwards.
+
+    """
+    for mirror in attached_mirrors(master):
+        mirror._detach(reindex=reindex)
+        mirror._master = None
+        notify(ObjectModifiedEvent(mirror, Attributes(IMirror, 'master_rel')))
+
+
 def add_mirror_id_to_master_after_adding(mirror, event):
     if mirror.master is not None:
         mirrors = ensure_mirrors_attr(mirror.master)
         mirrors.append(IUUID(mirror))
+        if len(mirrors) == 1:
+            reindex_mirrored(mirror.master)
 
 
 def only_remove_mirror_without_master(mirror, event):
@@ -171,20 +438,22 @@ def only_remove_mirror_without_master(mirror, event):
         raise ValueError('Cannot remove a mirror that is still attached to a master.')
 
 
-@implementer(IVocabularyFactory)
-class CatalogVocabularyFactory:
-    """Like plone.app.vocabularies.catalog.CatalogVocabularyFactory but without navroot"""
+def detach_mirrors_before_removing_master(obj, event):
+    """Detach all mirrors from a master folder that is about to be removed.
 
-    def __call__(self, context, query=None):
-        parsed = {}
-        if query:
-            parsed = parseQueryString(context, query['criteria'])
-            if 'sort_on' in query:
-                parsed['sort_on'] = query['sort_on']
-            if 'sort_order' in query:
-                parsed['sort_order'] = str(query['sort_order'])
+    Otherwise, the mirrors would keep sharing the removed master's content tree. The
+    per-object fan-out of un-indexing to the mirrors is skipped while the master is
+    being removed (see `unindex`), as detaching removes the mirrors' records in bulk.
+    The master's content isn't re-indexed as no longer mirrored, as its records are
+    about to be removed as well.
+
+    """
+    if IPloneSiteRoot.providedBy(event.object):
+        return
+    if IMirror.providedBy(obj):
+        return
 
-        return CatalogVocabulary.fromItems(parsed, context)
+    detach_mirrors(obj, reindex=False)
 
 
 def bare_uuid(obj):
@@ -240,37 +509,27 @@ def mirror_aware_attribute_uuid(context):
         return uuid(context)
 
 
-@implementer(ITG)
-@adapter(ITranslatable)
-def mirror_aware_attribute_tg(context):
-    tg = attributeTG(context)
-    if mirror := mirror_info(context).mirror:
-        mirror_tg = attributeTG(mirror)
-        return f'{tg}@{mirror_tg}'
-    else:
-        return tg
+# modelled after plone/app/multilingual/subscriber.py
 
 
-@implementer(ILanguage)
-@adapter(IDexterityContent)
-class MirrorAwareLanguage(Language):
-    def get_language(self):
-        info = mirror_info(self.context)
-        return (
-            ILanguage(info.mirror)
-            if info.mirror
-            else ILanguage(info.master)
-            if info.master
-            else super()
-        ).get_language()
-
-    def set_language(self, language):
-        if mirror_info(self.context).mirror is not None:
-            raise ValueError('Setting language not allowed for mirrored content.')
-        super().set_language(language)
+def invalidate_after_moving(obj, event):
+    """Invalidate cached lookups if content is moved into, out of or within a tree.
 
+    The same goes for content removed from a tree. Added content cannot have been
+    looked up before, so additions are ignored.
 
-# modelled after plone/app/multilingual/subscriber.py
+    """
+    if IObjectAddedEvent.providedBy(event):
+        return
+    if aq_base(obj) is not aq_base(event.object):
+        return
+
+    if any(
+        mirror_info(parent, include_self=True) != NOT_MIRRORED
+        for parent in (event.oldParent, event.newParent)
+        if parent is not None
+    ):
+        bump_tree_version()
 
 
 def reindex(obj, event):
@@ -305,11 +564,73 @@ def reindex(obj, event):
             f'{parent_master_id}@{mirror_id}' for mirror_id in info.mirror_ids
         ]
 
+    # Deferred as the indexing module builds on this one.
+    from .indexing import CopyCataloger
+
     cat = api.portal.get_tool('portal_catalog')
-    for parent_id in parent_ids:
-        brains = cat.unrestrictedSearchResults(UID=parent_id)
-        for brain in brains:
-            brain.getObject()[obj.id].indexObject()
+    catalog_copy = CopyCataloger(cat)
+    brains = cat.unrestrictedSearchResults(UID=list(parent_ids))
+    for brain, parent in zip(brains, get_objects(brains, restricted=False)):
+        copy = parent[obj.id]
+        if brain.UID == parent_ids[0]:
+            copy.indexObject()
+        else:
+            catalog_copy(copy, '/'.join(copy.getPhysicalPath()))
+
+
+POSITION_INDEX = 'getObjPositionInParent'
+
+PositionRecord = namedtuple('PositionRecord', (POSITION_INDEX,))
+
+
+def reindex_positions(container, event):
+    """Update the position index for a mirrored container's items at all locations.
+
+    Master and mirrors share their ordering, so re-ordering, adding or removing items
+    at any location changes the items' positions at all other locations as well. We
+    only update the position index, and only for those records whose position actually
+    changed. Positions are taken from the shared ordering, so no item is woken up.
+
+    Plone's default GopipIndex doesn't store positions but looks them up in the
+    containers when sorting, so there is nothing to do for it.
+
+    """
+    info = mirror_info(container, include_self=True)
+    if info == NOT_MIRRORED:
+        return
+
+    cat = api.portal.get_tool('portal_catalog')
+    index = cat._catalog.indexes.get(POSITION_INDEX)
+    if index is None or index.meta_type == 'GopipIndex':
+        return
+
+    ordering = container.getOrdering()
+    if not IExplicitOrdering.providedBy(ordering):
+        return
+
+    tree_paths = get_tree_paths(info)
+    own_tree_path = tree_paths.get(
+        IUUID(info.mirror if info.mirror is not None else info.master)
+    )
+    if own_tree_path is None:
+        return
+    start = len(own_tree_path)
+    relative_path = '/'.join(container.getPhysicalPath())[start:]
+
+    processQueue()
+    uids = cat._catalog.uids
+    changed = False
+    for position, id_ in enumerate(ordering.idsInOrder()):
+        record = PositionRecord(position)
+        for tree_path in tree_paths.values():
+            rid = uids.get(f'{tree_path}{relative_path}/{id_}')
+            if rid is None or index.getEntryForObject(rid) == position:
+                continue
+            index.index_object(rid, record)
+            changed = True
+
+    if changed:
+        cat._increment_counter()
 
 
 def unindex(obj, event):
@@ -329,22 +650,47 @@ def unindex(obj, event):
     info = mirror_info(obj)
     if info == NOT_MIRRORED:
         return
+    if _removes_master(info, obj, event):
+        return
 
     uuid = IUUID(obj).split('@')[0]
     uuids = [uuid] + [f'{uuid}@{mirror_id}' for mirror_id in info.mirror_ids]
 
+    # The copies need not be woken up just to remove their records. Pending indexing
+    # operations are processed first so they cannot re-create the records later.
+    processQueue()
     cat = api.portal.get_tool('portal_catalog')
-    for uuid in uuids:
-        brains = cat.unrestrictedSearchResults(UID=uuid)
-        for brain in brains:
-            brain.getObject().unindexObject()
+    paths = [brain.getPath() for brain in cat.unrestrictedSearchResults(UID=uuids)]
+    for path in paths:
+        cat.uncatalog_object(path)
+
+
+def _removes_master(info, obj, event):
+    """Tell whether an object is being removed along with the master of its tree."""
+    if info.mirror is not None or not IObjectWillBeRemovedEvent.providedBy(event):
+        return False
+
+    removed = aq_base(event.object)
+    passed_master = False
+    for element in map(aq_base, aq_chain(obj)):
+        passed_master = passed_master or element is info.master
+        if passed_master and element is removed:
+            return True
+    return False
 
 
-def mirror_info(obj):
+def mirror_info(obj, include_self=False):
+    """Find the master and mirror of the mirrored content tree an object belongs to.
+
+    By default, master and mirror folders themselves are not considered part of their
+    content tree. Pass include_self in order to get their own tree's info for them.
+
+    """
     if not ICollectiveMirrorLayer.providedBy(getRequest()):
         return NOT_MIRRORED
 
-    for element in aq_chain(obj)[1:]:
+    chain = aq_chain(obj)
+    for element in chain if include_self else chain[1:]:
         if ISiteRoot.providedBy(element):
             break
         if mirror_ids := getattr(element, MIRRORS_ATTR, ()):
@@ -364,16 +710,95 @@ def placeless_mirror_info(obj):
     if they are retrieved by IntId, such as when resolving a relation. We look them up
     in the catalog by their UUID, which would find them as located in the master tree.
 
+    The master found for a UUID is cached process-wide until any mirror is attached or
+    detached or any mirrored content is moved or removed, so repeated lookups for the
+    same objects don't query the catalog again.
+
     """
     if (info := mirror_info(obj)) != NOT_MIRRORED:
         return info
 
+    portal = api.portal.get()
+    uuid = IUUID(obj)
+    key = ('/'.join(portal.getPhysicalPath()), uuid)
+    version = tree_version()
+    master_oid = placeless_info_cache.get(key, version, _marker)
+    if master_oid is None:
+        return NOT_MIRRORED
+    if master_oid is not _marker:
+        try:
+            master = portal._p_jar.get(master_oid)
+        except KeyError:
+            master = None
+        if mirror_ids := getattr(master, MIRRORS_ATTR, ()):
+            return MirrorInfo(master, None, mirror_ids)
+
     cat = api.portal.get_tool('portal_catalog')
-    return (
+    info = (
         mirror_info(brains[0].getObject())
-        if (brains := cat.unrestrictedSearchResults(UID=IUUID(obj)))
+        if (brains := cat.unrestrictedSearchResults(UID=uuid))
         else NOT_MIRRORED
     )
+    if info == NOT_MIRRORED:
+        placeless_info_cache.set(key, version, None)
+    elif info.master._p_oid is not None:
+        # A master added in the current transaction has no oid to be cached by yet.
+        placeless_info_cache.set(key, version, info.master._p_oid)
+    return info
+
+
+def get_objects(brains, restricted=True):
+    """Wake up the objects of a number of catalog brains, loading them in one go.
+
+    Waking up objects one by one costs a round trip to the storage server for each cache
+    miss, e.g. with ZEO or RelStorage. We traverse to each distinct parent once and pass
+    the objects, still ghosts, to the ZODB connection's batched prefetch. Copies of the
+    same mirrored object are one persistent object, so it is prefetched once. Storages
+    that don't support prefetching load the objects one by one as usual.
+
+    Return the objects in the order of the brains, as brain.getObject() would or, if
+    restricted is false, brain._unrestrictedGetObject().
+
+    """
+    portal = api.portal.get()
+    parents = {}
+    locations = []
+    for brain in brains:
+        parent_path, obj_id = brain.getPath().rsplit('/', 1)
+        if parent_path not in parents:
+            parents[parent_path] = portal.unrestrictedTraverse(parent_path)
+        locations.append((parents[parent_path], obj_id))
+
+    prefetch = getattr(portal._p_jar, 'prefetch', None)
+    if prefetch is not None:
+        ghosts = {}
+        for parent, obj_id in locations:
+            obj = aq_base(aq_base(parent)._getOb(obj_id, None))
+            if getattr(obj, '_p_changed', False) is None:
+                ghosts[obj._p_oid] = obj
+        if ghosts:
+            prefetch(list(ghosts.values()))
+
+    return [
+        parent.restrictedTraverse(obj_id)
+        if restricted
+        else parent.unrestrictedTraverse(obj_id)
+        for parent, obj_id in locations
+    ]
+
+
+def get_tree_paths(info):
+    """Map the UUIDs of the master and all mirrors of a mirrored tree to their paths.
+
+    All locations are resolved by a single catalog query, without waking up the master
+    or any of the mirrors.
+
+    """
+    uuids = [IUUID(info.master)] + list(info.mirror_ids)
+    cat = api.portal.get_tool('portal_catalog')
+    return {
+        brain.UID: brain.getPath() for brain in cat.unrestrictedSearchResults(UID=uuids)
+    }
 
 
 def get_object_in_tree(obj, target):
@@ -390,18 +815,36 @@ def get_object_in_tree(obj, target):
     target, IndexError is raised.
 
     """
+    return get_brain_in_tree(obj, target).getObject()
+
+
+def get_brain_in_tree(obj, target):
+    """Like get_object_in_tree but return the catalog brain instead of the object.
+
+    This saves waking up the object for callers that only need its path, URL or
+    metadata.
+
+    """
+    return get_brains_in_tree([obj], target)[0]
+
+
+def get_brains_in_tree(objs, target):
+    """Batch form of get_brain_in_tree, using one catalog query for all objects."""
     if not getattr(target, MIRRORS_ATTR, None):
         raise ValueError(f'{target} is neither a mirror nor a mirrored folder.')
 
-    info = placeless_mirror_info(obj)
-    if not (
-        aq_base(info.master) is aq_base(target)
-        or info.mirror_ids
-        and IUUID(target) in info.mirror_ids
-    ):
-        raise LocationError(f'{obj} is not located in the content tree of {target}.')
+    for obj in objs:
+        info = placeless_mirror_info(obj)
+        if not (
+            aq_base(info.master) is aq_base(target)
+            or info.mirror_ids
+            and IUUID(target) in info.mirror_ids
+        ):
+            raise LocationError(
+                f'{obj} is not located in the content tree of {target}.'
+            )
 
-    return _get_object_in_tree(obj, target)
+    return _get_brains_in_tree(objs, target)
 
 
 def get_navroots(content):
@@ -431,7 +874,8 @@ def get_object_in_navroot(obj, target):
     process is repeated with respect to the nav root next-closest to the target, and so
     on, up to the portal root.
 
-    If the first mirror thus found is not unique, LookupError is raised.
+    If the first mirror thus found is not unique, LookupError is raised. If there is
+    none, MirrorNotFound is raised.
 
     """
     info = placeless_mirror_info(obj)
@@ -439,18 +883,71 @@ def get_object_in_navroot(obj, target):
         logger.debug(f'{obj} is not located in any mirrored content tree.')
         return obj
 
-    trees = {
-        brains[0].getObject()
-        for mirror_id in info.mirror_ids
-        if (brains := api.content.find(UID=mirror_id))
-    }
-    trees.add(api.content.find(UID=IUUID(info.master))[0].getObject())
+    tree = _tree_by_navroot(info, obj, target)
+    return _get_brains_in_tree([obj], tree)[0].getObject()
+
+
+def get_brain_in_navroot(obj, target):
+    """Like get_object_in_navroot but return the catalog brain instead of the object.
+
+    Objects that aren't part of a mirrored content tree are looked up by their own UUID.
+
+    """
+    return get_brains_in_navroot([obj], target)[0]
+
+
+def get_brains_in_navroot(objs, target):
+    """Batch form of get_brain_in_navroot.
+
+    Objects are grouped by their master folder, so that the mirror is looked up once per
+    mirrored tree and the objects of each tree are retrieved by one catalog query.
+
+    """
+    brains = {}
+    for info, members in _group_by_master(objs).values():
+        if info == NOT_MIRRORED:
+            found = _get_brains_by_uuid(
+                members, [IUUID(obj) for obj in members], 'the portal'
+            )
+        else:
+            found = _get_brains_in_tree(
+                members, _tree_by_navroot(info, members[0], target)
+            )
+        brains.update(zip(map(id, members), found))
+    return [brains[id(obj)] for obj in objs]
+
+
+def get_relations_in_navroot(relations, target):
+    """Resolve relations to their targets as seen in the mirror sharing target's navroot.
+
+    Relations may be passed as RelationValues or as IntIds of their targets. Relations
+    into a mirrored tree resolve to the master copy of their targets, so this finds the
+    copies local to the mirror that a template is rendered for, e.g. related items.
+
+    Targets are grouped by their master folder, so that the mirror is looked up once per
+    mirrored tree and the targets within each tree are retrieved by one catalog query.
+    Broken relations resolve to None.
+
+    """
+    intids = getUtility(IIntIds)
+    objs = [
+        intids.queryObject(relation) if isinstance(relation, int) else relation.to_object
+        for relation in relations
+    ]
+    found = [obj for obj in objs if obj is not None]
+    brains = get_brains_in_navroot(found, target)
+    targets = dict(zip(map(id, found), get_objects(brains)))
+    return [targets[id(obj)] if obj is not None else None for obj in objs]
+
+
+def _tree_by_navroot(info, obj, target):
+    brains = api.content.find(UID=[IUUID(info.master)] + list(info.mirror_ids))
+    trees = set(get_objects(brains))
 
     navroots_by_tree = {aq_base(tree): get_navroots(tree) for tree in trees}
     for shared_navroot in get_navroots(target):
         if shared_navroot in trees:
-            tree = shared_navroot
-            break
+            return shared_navroot
 
         candidates = [
             tree
@@ -467,15 +964,9 @@ def get_object_in_navroot(obj, target):
                 f'containing {obj} not unique.'
             )
         if len(candidates) == 1:
-            tree = candidates[0]
-            break
-    else:
-        raise AssertionError(
-            f'No mirror found for {obj} by navigation root. '
-            f'This should never happen.'
-        )
+            return candidates[0]
 
-    return _get_object_in_tree(obj, tree)
+    raise MirrorNotFound(f'No mirror found for {obj} by navigation root.')
 
 
 def get_object_for_language(obj, language):
@@ -500,14 +991,50 @@ def get_object_for_language(obj, language):
         logger.debug(f'{obj} is not located in any mirrored content tree.')
         return obj
 
+    return _get_brains_for_language(info, [obj], language)[0].getObject()
+
+
+def get_brain_for_language(obj, language):
+    """Like get_object_for_language but return the catalog brain instead of the object.
+
+    Objects that aren't part of a mirrored content tree are looked up by their own UUID.
+
+    """
+    return get_brains_for_language([obj], language)[0]
+
+
+def get_brains_for_language(objs, language):
+    """Batch form of get_brain_for_language.
+
+    Objects are grouped by their master folder, so that the mirror is looked up once per
+    mirrored tree and the objects of each tree are retrieved by one catalog query.
+    Neither the mirrors nor the objects are woken up.
+
+    """
+    brains = {}
+    for info, members in _group_by_master(objs).values():
+        found = _get_brains_for_language(info, members, language)
+        brains.update(zip(map(id, members), found))
+    return [brains[id(obj)] for obj in objs]
+
+
+def _get_brains_for_language(info, objs, language):
+    if info == NOT_MIRRORED:
+        return _get_brains_by_uuid(objs, [IUUID(obj) for obj in objs], 'the portal')
+
     if language is None:
-        return _get_object_in_tree(obj, info.master)
+        return _get_brains_in_tree(objs, info.master)
 
+    mirror_id = _mirror_id_for_language(info, objs[0], language)
+    uuids = [f'{bare_uuid(obj)}@{mirror_id}' for obj in objs]
+    return _get_brains_by_uuid(objs, uuids, f'mirror {mirror_id}')
+
+
+def _mirror_id_for_language(info, obj, language):
     candidates = [
-        brain
-        for mirror_id in info.mirror_ids
-        if (brains := api.content.find(UID=mirror_id))
-        and (brain := brains[0]).Language == language
+        brain.UID
+        for brain in api.content.find(UID=list(info.mirror_ids))
+        if brain.Language == language
     ]
 
     if not candidates:
@@ -518,18 +1045,36 @@ def get_object_for_language(obj, language):
         raise IndexError(
             f'Mirror in language {language} containing {obj} not unique in catalog.'
         )
-    return _get_object_in_tree(obj, candidates[0].getObject())
+    return candidates[0]
+
+
+def _group_by_master(objs):
+    groups = {}
+    for obj in objs:
+        info = placeless_mirror_info(obj)
+        key = None if info == NOT_MIRRORED else id(info.master)
+        groups.setdefault(key, (info, []))[1].append(obj)
+    return groups
+
+
+def _get_brains_in_tree(objs, target):
+    uuids = [uuid_at_mirror(obj, target) for obj in objs]
+    return _get_brains_by_uuid(objs, uuids, target)
 
 
-def _get_object_in_tree(obj, target):
+def _get_brains_by_uuid(objs, uuids, target):
     cat = api.portal.get_tool('portal_catalog')
-    obj_uuid = uuid_at_mirror(obj, target)
-    brains = cat.unrestrictedSearchResults(UID=obj_uuid)
-    if len(brains) != 1:
-        raise IndexError(f'{obj} at {target} not found in catalog.')
+    brains_by_uuid = {}
+    for brain in cat.unrestrictedSearchResults(UID=uuids):
+        brains_by_uuid.setdefault(brain.UID, []).append(brain)
 
-    target_obj = brains[0].getObject()
-    return target_obj
+    brains = []
+    for obj, uuid in zip(objs, uuids):
+        found = brains_by_uuid.get(uuid, ())
+        if len(found) != 1:
+            raise IndexError(f'{obj} at {target} not found in catalog.')
+        brains.append(found[0])
+    return brains
 
 
 # Known issues:
@@ -542,17 +1087,19 @@ def _get_object_in_tree(obj, target):
 #
 # * While we need to allow unsetting (and thus, also setting) the master of an existing
 #   mirror (because we could not delete an attached mirror without collateral damage, in
-#   a robust way), setting a new master doesn't get the contents indexed in the context
-#   of the mirror yet.
+#   a robust way), setting a new master through the master_rel field doesn't get the
+#   contents indexed in the context of the mirror yet. Use attach_mirrors or
+#   swap_master (or the @@attach-mirrors view) for that.
 #
 # * Mirrors cannot be translated while attached to a master, as that would result in an
 #   attempt to create a new content tree. The work-around is to unset the master folder,
 #   create the translated mirror, and then edit the mirror in both the source and target
 #   language to set the appropriate master folders.
 #
-# * Deleting a folder while it has mirrors isn't handled yet. Plone just warns about
-#   breaking references but we might want to offer some better UI to remove all mirrors
-#   along with the folder, or to replace one of the mirrors with a new master folder.
+# * Deleting a folder while it has mirrors detaches all of its mirrors, leaving them
+#   empty. Plone just warns about breaking references but we might want to offer some
+#   better UI to remove all mirrors along with the folder, or to replace one of the
+#   mirrors with a new master folder.
 #
 # * A mirror still attached to a master cannot be deleted, which is good, but we don't
 #   issue a useful error message to the user yet.
@@ -0,0 +1,41 @@
+"""Integration with plone.app.multilingual, only loaded if that is installed."""
+
+from .mirror import mirror_info
+from plone.app.multilingual.dx.language import Language
+from plone.app.multilingual.interfaces import ITG
+from plone.app.multilingual.interfaces import ITranslatable
+from plone.app.multilingual.itg import attributeTG
+from plone.dexterity.interfaces import IDexterityContent
+from Products.CMFPlone.interfaces import ILanguage
+from zope.component import adapter
+from zope.interface import implementer
+
+
+@implementer(ITG)
+@adapter(ITranslatable)
+def mirror_aware_attribute_tg(context):
+    tg = attributeTG(context)
+    if mirror := mirror_info(context).mirror:
+        mirror_tg = attributeTG(mirror)
+        return f'{tg}@{mirror_tg}'
+    else:
+        return tg
+
+
+@implementer(ILanguage)
+@adapter(IDexterityContent)
+class MirrorAwareLanguage(Language):
+    def get_language(self):
+        info = mirror_info(self.context)
+        return (
+            ILanguage(info.mirror)
+            if info.mirror
+            else ILanguage(info.master)
+            if info.master
+            else super()
+        ).get_language()
+
+    def set_language(self, language):
+        if mirror_info(self.context).mirror is not None:
+            raise ValueError('Setting language not allowed for mirrored content.')
+        super().set_language(language)
@@ -0,0 +1,79 @@
+from persistent import Persistent
+from persistent.list import PersistentList
+from plone.folder.default import DefaultOrdering
+from plone.folder.interfaces import IExplicitOrdering
+from plone.folder.interfaces import IOrderableFolder
+from ZODB.POSException import ConflictError
+from zope.annotation.interfaces import IAnnotations
+from zope.component import adapter
+from zope.interface import implementer
+
+
+ORDERING_NAME = 'collective.mirror'
+
+
+class MergingOrder(PersistentList):
+    """List of item ids that merges concurrent changes instead of conflicting.
+
+    Concurrent transactions may each append and remove items. At most one of them may
+    re-order items, since merging two different orders cannot be done sensibly.
+
+    """
+
+    def _p_resolveConflict(self, old, committed, new):
+        old_ids = old['data']
+        old_set = set(old_ids)
+        merged = {}
+        removed = set()
+        reordered = None
+        for state in (committed, new):
+            ids = state['data']
+            kept = [obj_id for obj_id in ids if obj_id in old_set]
+            added = [obj_id for obj_id in ids if obj_id not in old_set]
+            if ids != kept + added:
+                raise ConflictError('Items were inserted other than by appending.')
+            kept_set = set(kept)
+            removed |= old_set - kept_set
+            if kept != [obj_id for obj_id in old_ids if obj_id in kept_set]:
+                if reordered is not None:
+                    raise ConflictError('Items were re-ordered concurrently.')
+                reordered = kept
+            merged.update(dict.fromkeys(added))
+
+        base = old_ids if reordered is None else reordered
+        data = [obj_id for obj_id in base if obj_id not in removed] + list(merged)
+        return dict(committed, data=data)
+
+
+@implementer(IExplicitOrdering)
+@adapter(IOrderableFolder)
+class MirrorOrdering(DefaultOrdering):
+    """Ordering shared by a master folder and its mirrors.
+
+    The order is kept in a MergingOrder, so concurrent additions to the same mirrored
+    folder, through the master or any mirror, don't conflict. Positions aren't stored
+    persistently, which would conflict on every addition, but derived from the order
+    and cached on it for as long as its state is loaded.
+
+    """
+
+    def _order(self, create=False):
+        annotations = IAnnotations(self.context)
+        if create:
+            return annotations.setdefault(self.ORDER_KEY, MergingOrder())
+        return annotations.get(self.ORDER_KEY, [])
+
+    def _set_order(self, value):
+        # Update in place, since the order is shared by master and mirrors.
+        order = self._order(create=True)
+        order[:] = value
+        order._v_pos = None
+
+    def _pos(self, create=False):
+        order = self._order(create)
+        pos = getattr(order, '_v_pos', None)
+        if pos is None:
+            pos = {obj_id: index for index, obj_id in enumerate(order)}
+            if isinstance(order, Persistent):
+                order._v_pos = pos
+        return pos
@@ -0,0 +1,535 @@
+"""Incremental replication of master folders to folders in other sites.
+
+Unlike mirrors, which share their master's content tree by reference and therefore
+need to live in the same database, a replica is a separate copy of a master's content,
+e.g. in another Plone site. It is kept up to date from a change log recorded by the
+master: additions, modifications, moves and deletions are logged in order, and the
+replica consumes them in batches. The last change applied is stored with the replica
+as a checkpoint per source, so replication resumes where it left off. Replicas report
+their checkpoints back to the master, which drops the changes all of them have applied.
+
+Content is passed as JSON as produced by plone.restapi's field serializers, so it can
+be transferred between sites in the same process (LocalSource) or over HTTP
+(RemoteSource). Relations are not replicated, as their targets would need to be mapped
+to the other site's content.
+
+"""
+
+from .mirror import bare_uuid
+from .mirror import IMirror
+from Acquisition import aq_base
+from Acquisition import aq_chain
+from Acquisition import aq_parent
+from base64 import b64encode
+from BTrees.Length import Length
+from BTrees.LOBTree import LOBTree
+from BTrees.OOBTree import OOBTree
+from itertools import islice
+from persistent import Persistent
+from plone import api
+from plone.dexterity.utils import iterSchemata
+from plone.namedfile.interfaces import INamedField
+from plone.restapi.interfaces import IDeserializeFromJson
+from plone.restapi.interfaces import IFieldSerializer
+from plone.uuid.interfaces import IMutableUUID
+from plone.uuid.interfaces import IUUID
+from Products.CMFCore.interfaces import IFolderish
+from Products.CMFCore.interfaces import ISiteRoot
+from Products.CMFCore.utils import getToolByName
+from z3c.relationfield.interfaces import IRelation
+from z3c.relationfield.interfaces import IRelationList
+from zope.annotation.interfaces import IAnnotations
+from zope.component import queryMultiAdapter
+from zope.component.hooks import getSite
+from zope.component.hooks import setSite
+from zope.globalrequest import getRequest
+from zope.schema import getFields
+
+import json
+import transaction
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+LOG_KEY = 'collective.mirror.changelog'
+
+CHECKPOINT_KEY = 'collective.mirror.replication_checkpoint'
+
+BATCH_SIZE = 100
+
+
+class ChangeLog(Persistent):
+    """Ordered log of changes to the content of a master folder.
+
+    Changes are numbered consecutively, starting from 1. Each change is a dict with the
+    operation (add, modify, move or delete) and the bare UUID of the object changed, or
+    None for the master itself. Additions and moves also record the bare UUID of the
+    new parent, again None for the master, and the object's new id.
+
+    The log also keeps the checkpoint acknowledged by each replica, and only changes
+    that some replica hasn't applied yet are kept.
+
+    """
+
+    def __init__(self):
+        self._changes = LOBTree()
+        self._length = Length()
+        self._acknowledged = OOBTree()
+
+    def append(self, op, uid, parent=None, id=None):
+        # Concurrent appends get the same number and conflict, so they are retried.
+        self._length.change(1)
+        seq = self._length()
+        self._changes[seq] = {'op': op, 'uid': uid, 'parent': parent, 'id': id}
+        return seq
+
+    def since(self, seq, limit=BATCH_SIZE):
+        """Return up to limit pairs of number and change, after the given number."""
+        return list(islice(self._changes.items(min=seq, excludemin=True), limit))
+
+    def truncate(self, seq):
+        """Drop all changes up to a number, e.g. once all replicas have applied them."""
+        for key in list(self._changes.keys(max=seq)):
+            del self._changes[key]
+
+    def truncated(self):
+        """Return the number of the last change dropped, or 0 if none were."""
+        try:
+            return self._changes.minKey() - 1
+        except ValueError:
+            return self._length()
+
+    def acknowledge(self, replica, seq):
+        """Record that a replica has applied all changes up to a number.
+
+        Changes that all replicas have applied are dropped.
+
+        """
+        self._acknowledged[replica] = max(seq, self._acknowledged.get(replica, 0))
+        self.truncate(min(self._acknowledged.values()))
+
+    def forget(self, replica):
+        """Stop keeping changes for a replica, e.g. one that has been removed."""
+        if replica in self._acknowledged:
+            del self._acknowledged[replica]
+            if self._acknowledged:
+                self.truncate(min(self._acknowledged.values()))
+
+    def __len__(self):
+        return self._length()
+
+
+def enable_replication(master):
+    """Start recording changes to a master folder's content, return its change log.
+
+    The master's current content is logged as added, so replicas start with a full
+    copy of it.
+
+    """
+    annotations = IAnnotations(master)
+    if LOG_KEY in annotations:
+        return annotations[LOG_KEY]
+
+    log = annotations[LOG_KEY] = ChangeLog()
+    for obj in master.objectValues():
+        log.append('add', bare_uuid(obj), None, obj.getId())
+    return log
+
+
+def get_changelog(obj, include_self=False):
+    """Find the replicated master folder an object belongs to, and its change log.
+
+    Return a pair of master and log, or of None and None for objects that aren't part
+    of a replicated tree. By default, a master is not considered part of its own tree.
+
+    Content in a mirror belongs to the tree of the mirror's master, so changes made
+    through a mirror are logged by the master (or a replicated folder containing it).
+
+    """
+    chain = aq_chain(obj)
+    for element in chain if include_self else chain[1:]:
+        if ISiteRoot.providedBy(element):
+            break
+        if IMirror.providedBy(element):
+            master = element.master
+            if master is None:
+                break
+            return get_changelog(master, include_self=True)
+        annotations = getattr(aq_base(element), '__annotations__', None)
+        if annotations is not None and LOG_KEY in annotations:
+            return element, annotations[LOG_KEY]
+    return None, None
+
+
+def _uuid_in_tree(master, obj):
+    if IMirror.providedBy(obj) and obj.master is not None:
+        obj = obj.master
+    return None if aq_base(obj) is aq_base(master) else bare_uuid(obj)
+
+
+def record_moved(obj, event):
+    """Log additions, moves and deletions of content in replicated trees.
+
+    Only the object moved is logged, not its content, since that is replicated along
+    with it.
+
+    """
+    if aq_base(obj) is not aq_base(event.object):
+        return
+
+    old_master, old_log = (
+        get_changelog(event.oldParent, include_self=True)
+        if event.oldParent is not None
+        else (None, None)
+    )
+    new_master, new_log = (
+        get_changelog(event.newParent, include_self=True)
+        if event.newParent is not None
+        else (None, None)
+    )
+    uid = bare_uuid(obj)
+    if old_log is not None and old_log is new_log:
+        parent = _uuid_in_tree(new_master, event.newParent)
+        new_log.append('move', uid, parent, event.newName)
+        return
+
+    if old_log is not None:
+        old_log.append('delete', uid)
+    if new_log is not None:
+        parent = _uuid_in_tree(new_master, event.newParent)
+        new_log.append('add', uid, parent, event.newName)
+
+
+def record_modified(obj, event):
+    """Log modifications, including workflow transitions and re-ordering."""
+    master, log = get_changelog(obj, include_self=True)
+    if log is not None:
+        log.append('modify', _uuid_in_tree(master, obj))
+
+
+def export_content(obj):
+    """Export an object's content and state as JSON-compatible data.
+
+    File and image data is included base64-encoded, so it can be deserialized again.
+
+    """
+    request = getRequest()
+    data = {}
+    for schema in iterSchemata(obj):
+        for name, field in getFields(schema).items():
+            if IRelation.providedBy(field) or IRelationList.providedBy(field):
+                continue
+            if INamedField.providedBy(field):
+                value = field.get(field.interface(obj))
+                data[name] = (
+                    None
+                    if value is None
+                    else {
+                        'data': b64encode(value.data).decode('ascii'),
+                        'encoding': 'base64',
+                        'filename': value.filename,
+                        'content-type': value.contentType,
+                    }
+                )
+            elif serializer := queryMultiAdapter(
+                (field, obj, request), IFieldSerializer
+            ):
+                data[name] = serializer()
+
+    folderish = IFolderish.providedBy(obj)
+    return {
+        'UID': bare_uuid(obj),
+        'id': obj.getId(),
+        'portal_type': obj.portal_type,
+        'review_state': api.content.get_state(obj, default=None),
+        'children': (
+            [bare_uuid(child) for child in obj.objectValues()] if folderish else []
+        ),
+        'data': data,
+    }
+
+
+class LocalSource:
+    """Read changes and content of a master folder in another site of this process.
+
+    The master may live in the same database as the replica or a mounted one. Either
+    way, acknowledging a checkpoint is part of the replica's transaction.
+
+    """
+
+    def __init__(self, master):
+        self.master = master
+        self.key = '/'.join(master.getPhysicalPath())
+
+    def changes(self, since, limit=BATCH_SIZE):
+        return self._log().since(since, limit)
+
+    def truncated(self):
+        return self._log().truncated()
+
+    def acknowledge(self, replica, seq):
+        self._log().acknowledge(replica, seq)
+
+    def forget(self, replica):
+        self._log().forget(replica)
+
+    def _log(self):
+        return IAnnotations(self.master)[LOG_KEY]
+
+    def export(self, uid):
+        """Export an object in the master's tree by UUID, or the master for None.
+
+        Raise LookupError if the object cannot be found (anymore).
+
+        """
+        old_site = getSite()
+        setSite(self._site())
+        try:
+            return export_content(self._find(uid))
+        finally:
+            setSite(old_site)
+
+    def _site(self):
+        for element in aq_chain(self.master):
+            if ISiteRoot.providedBy(element):
+                return element
+
+    def _find(self, uid):
+        if uid is None:
+            return self.master
+        cat = getToolByName(self.master, 'portal_catalog')
+        brains = cat.unrestrictedSearchResults(
+            UID=uid, path='/'.join(self.master.getPhysicalPath())
+        )
+        if not brains:
+            raise LookupError(f'No content found for UID {uid}.')
+        return brains[0]._unrestrictedGetObject()
+
+
+class RemoteSource:
+    """Read changes and content of a master folder in another site over HTTP.
+
+    This uses the @mirror-changes and @mirror-export services of the master folder,
+    authenticating with basic auth if credentials are given.
+
+    Checkpoints are only acknowledged once the replica's transaction has been
+    committed, since the master drops the changes acknowledged right away.
+
+    """
+
+    def __init__(self, url, username=None, password=None, timeout=60):
+        self.url = self.key = url.rstrip('/')
+        self.timeout = timeout
+        self.headers = {'Accept': 'application/json'}
+        if username is not None:
+            credentials = f'{username}:{password}'.encode('utf-8')
+            self.headers['Authorization'] = (
+                f'Basic {b64encode(credentials).decode("ascii")}'
+            )
+
+    def changes(self, since, limit=BATCH_SIZE):
+        result = self._get('@mirror-changes', since=since, limit=limit)
+        return [(item['seq'], item) for item in result['items']]
+
+    def truncated(self):
+        return self._get('@mirror-changes', limit=0)['truncated']
+
+    def acknowledge(self, replica, seq):
+        transaction.get().addAfterCommitHook(self._acknowledge, (replica, seq))
+
+    def _acknowledge(self, committed, replica, seq):
+        if committed:
+            self._request(
+                'POST', '@mirror-changes', body={'replica': replica, 'seq': seq}
+            )
+
+    def forget(self, replica):
+        self._request('DELETE', '@mirror-changes', replica=replica)
+
+    def export(self, uid):
+        params = {} if uid is None else {'uid': uid}
+        try:
+            return self._get('@mirror-export', **params)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                raise LookupError(f'No content found for UID {uid}.')
+            raise
+
+    def _get(self, service, **params):
+        with self._request('GET', service, **params) as response:
+            return json.load(response)
+
+    def _request(self, method, service, body=None, **params):
+        url = f'{self.url}/{service}?{urllib.parse.urlencode(params)}'
+        headers = dict(self.headers)
+        if body is not None:
+            body = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(url, body, headers, method=method)
+        response = urllib.request.urlopen(request, timeout=self.timeout)
+        if method == 'GET':
+            return response
+        response.close()
+
+
+def replicate(source, replica, batch_size=BATCH_SIZE, commit=False):
+    """Apply the changes logged by a source's master folder to a replica folder.
+
+    Changes are applied in batches, starting after the replica's checkpoint for the
+    source. After each batch, the checkpoint is updated and acknowledged to the source,
+    and a savepoint is made or, if commit is true, the transaction is committed, so an
+    interrupted replication resumes after the last batch committed. Sources only act on
+    the acknowledgement along with the replica's transaction being committed.
+
+    If the source has dropped changes the replica hasn't applied, e.g. because the
+    replica is new, the replica's content is replaced by a full copy first. Return the
+    number of changes applied.
+
+    """
+    checkpoints = IAnnotations(replica).get(CHECKPOINT_KEY)
+    if checkpoints is None:
+        checkpoints = IAnnotations(replica)[CHECKPOINT_KEY] = OOBTree()
+    replica_id = IUUID(replica)
+    since = checkpoints.get(source.key, 0)
+    if since < (truncated := source.truncated()):
+        copy_all(source, replica)
+        since = checkpoints[source.key] = truncated
+        _save(commit)
+
+    applied = 0
+    while changes := source.changes(since, batch_size):
+        for seq, change in changes:
+            apply_change(source, replica, change)
+        since = checkpoints[source.key] = changes[-1][0]
+        applied += len(changes)
+        source.acknowledge(replica_id, since)
+        _save(commit)
+
+    return applied
+
+
+def forget_replica(source, replica):
+    """Stop replicating from a source to a replica, e.g. before removing the replica.
+
+    The source no longer keeps changes that only this replica hasn't applied yet.
+
+    """
+    checkpoints = IAnnotations(replica).get(CHECKPOINT_KEY)
+    if checkpoints is not None and source.key in checkpoints:
+        del checkpoints[source.key]
+    source.forget(IUUID(replica))
+
+
+def _save(commit):
+    if commit:
+        transaction.commit()
+    else:
+        transaction.savepoint(optimistic=True)
+
+
+def copy_all(source, replica):
+    """Replace a replica's content by a copy of the source's current content."""
+    if children := replica.objectValues():
+        api.content.delete(objects=children, check_linkintegrity=False)
+    item = source.export(None)
+    for child_uid in item['children']:
+        try:
+            _import_tree(source, replica, source.export(child_uid))
+        except LookupError:
+            pass
+    _update(replica, item, with_data=False)
+
+
+def apply_change(source, replica, change):
+    """Apply one logged change to a replica.
+
+    Content is exported from the source when the change is applied, so it is in its
+    current state rather than that at the time of the change. Changes to content that
+    has since been removed are skipped, since their deletion is logged later on.
+
+    """
+    op = change['op']
+    obj = _find(replica, change['uid'])
+    if op == 'delete':
+        if obj is not None:
+            api.content.delete(obj, check_linkintegrity=False)
+        return
+
+    if op in ('add', 'move'):
+        parent = _find(replica, change['parent'])
+        if parent is None:
+            return
+        if obj is not None:
+            if aq_base(aq_parent(obj)) is not aq_base(parent):
+                obj = api.content.move(obj, parent)
+            if obj.getId() != change['id']:
+                obj = api.content.rename(obj, change['id'])
+            return
+
+    try:
+        item = source.export(change['uid'])
+    except LookupError:
+        return
+
+    if obj is None and op != 'modify':
+        _import_tree(source, parent, item)
+    elif obj is not None:
+        _update(obj, item, with_data=change['uid'] is not None)
+
+
+def _find(replica, uid):
+    if uid is None:
+        return replica
+    cat = getToolByName(replica, 'portal_catalog')
+    brains = cat.unrestrictedSearchResults(
+        UID=uid, path='/'.join(replica.getPhysicalPath())
+    )
+    return brains[0]._unrestrictedGetObject() if brains else None
+
+
+def _import_tree(source, parent, item):
+    stack = [(parent, item)]
+    while stack:
+        parent, item = stack.pop()
+        obj = api.content.create(
+            parent, type=item['portal_type'], id=item['id'], safe_id=False
+        )
+        IMutableUUID(obj).set(item['UID'])
+        _update(obj, item)
+        for child_uid in reversed(item['children']):
+            try:
+                stack.append((obj, source.export(child_uid)))
+            except LookupError:
+                pass
+
+
+def _update(obj, item, with_data=True):
+    if with_data:
+        deserializer = queryMultiAdapter((obj, getRequest()), IDeserializeFromJson)
+        deserializer(data=item['data'])
+        if item['review_state'] is not None:
+            _set_state(obj, item['review_state'])
+
+    if IFolderish.providedBy(obj):
+        ids = {bare_uuid(child): child.getId() for child in obj.objectValues()}
+        ordering = obj.getOrdering()
+        position = 0
+        for child_uid in item['children']:
+            if child_uid in ids:
+                ordering.moveObjectToPosition(ids[child_uid], position)
+                position += 1
+
+    obj.reindexObject()
+
+
+def _set_state(obj, state):
+    wftool = getToolByName(obj, 'portal_workflow')
+    for workflow in wftool.getWorkflowsFor(obj):
+        if workflow.states.get(state) is None:
+            continue
+        status = wftool.getStatusOf(workflow.getId(), obj) or {}
+        if status.get(workflow.state_var) != state:
+            status = dict(status, **{workflow.state_var: state})
+            wftool.setStatusOf(workflow.getId(), obj, status)
+            workflow.updateRoleMappingsFor(obj)
@@ -0,0 +1,56 @@
+from collective.mirror.estimate import estimate_attach
+from collective.mirror.estimate import estimate_delete
+from collective.mirror.estimate import estimate_detach
+from collective.mirror.estimate import estimate_move
+from collective.mirror.mirror import IMirror
+from plone import api
+from plone.restapi.services import Service
+from zExceptions import BadRequest
+
+
+class MirrorEstimateGet(Service):
+    """Estimate the catalog work of an operation on the context without doing it.
+
+    The `operation` parameter is one of
+
+    * `attach`: attach the context, a mirror, to the master given by its `master` UID,
+    * `detach`: detach the context, a mirror, from its master,
+    * `move`: move the context into the folder given by its `target` UID,
+    * `delete`: delete the context, e.g. a master folder.
+
+    Object counts are taken from the catalog, so no content is traversed. The estimate
+    is informational only.
+
+    """
+
+    def reply(self):
+        form = self.request.form
+        operation = form.get('operation')
+        if operation in ('attach', 'detach') and not IMirror.providedBy(self.context):
+            raise BadRequest(f'Cannot {operation} a folder that is not a mirror.')
+
+        if operation == 'attach':
+            result = estimate_attach(self.context, self._get('master'))
+        elif operation == 'detach':
+            result = estimate_detach(self.context)
+        elif operation == 'move':
+            result = estimate_move(self.context, self._get('target'))
+        elif operation == 'delete':
+            result = estimate_delete(self.context)
+        else:
+            raise BadRequest(f'Unknown operation {operation!r}.')
+
+        return dict(
+            result._asdict(),
+            **{
+                '@id': f'{self.context.absolute_url()}/@mirror-estimate',
+                'operation': operation,
+            },
+        )
+
+    def _get(self, name):
+        uid = self.request.form.get(name)
+        obj = api.content.get(UID=uid) if uid else None
+        if obj is None:
+            raise BadRequest(f'No {name} found for UID {uid}.')
+        return obj
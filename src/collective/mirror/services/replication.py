@@ -0,0 +1,99 @@
+from collective.mirror.replication import BATCH_SIZE
+from collective.mirror.replication import LocalSource
+from collective.mirror.replication import LOG_KEY
+from plone.protect.interfaces import IDisableCSRFProtection
+from plone.restapi.deserializer import json_body
+from plone.restapi.services import Service
+from zExceptions import BadRequest
+from zExceptions import NotFound
+from zope.annotation.interfaces import IAnnotations
+from zope.interface import alsoProvides
+
+
+class MirrorChangesGet(Service):
+    """List the changes logged by the context, a replicated master folder.
+
+    Changes are returned in order, starting after the number given as the `since`
+    parameter, and at most `limit` of them. `truncated` is the number of the last
+    change dropped already.
+
+    """
+
+    def reply(self):
+        log = IAnnotations(self.context).get(LOG_KEY)
+        if log is None:
+            raise NotFound('Replication is not enabled for this folder.')
+        try:
+            since = int(self.request.form.get('since', 0))
+            limit = int(self.request.form.get('limit', BATCH_SIZE))
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+        return {
+            '@id': f'{self.context.absolute_url()}/@mirror-changes',
+            'truncated': log.truncated(),
+            'items': [dict(change, seq=seq) for seq, change in log.since(since, limit)],
+        }
+
+
+class MirrorChangesPost(Service):
+    """Acknowledge the checkpoint of a replica of the context, a replicated master.
+
+    The body gives the replica's UID as `replica` and the number of the last change it
+    has applied as `seq`. Changes all replicas have applied are dropped from the log.
+
+    """
+
+    def reply(self):
+        alsoProvides(self.request, IDisableCSRFProtection)
+        log = IAnnotations(self.context).get(LOG_KEY)
+        if log is None:
+            raise NotFound('Replication is not enabled for this folder.')
+        data = json_body(self.request)
+        try:
+            replica = str(data['replica'])
+            seq = int(data['seq'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise BadRequest(f'Invalid acknowledgement: {e}')
+
+        log.acknowledge(replica, seq)
+        self.request.response.setStatus(204)
+
+
+class MirrorChangesDelete(Service):
+    """Stop keeping changes for a replica of the context, a replicated master.
+
+    The replica's UID is given as the `replica` parameter. Changes all remaining
+    replicas have applied are dropped from the log.
+
+    """
+
+    def reply(self):
+        alsoProvides(self.request, IDisableCSRFProtection)
+        log = IAnnotations(self.context).get(LOG_KEY)
+        if log is None:
+            raise NotFound('Replication is not enabled for this folder.')
+        replica = self.request.form.get('replica')
+        if not replica:
+            raise BadRequest('No replica given.')
+
+        log.forget(replica)
+        self.request.response.setStatus(204)
+
+
+class MirrorExportGet(Service):
+    """Export content of the context, a replicated master folder, for replication.
+
+    The content is given by its UID as the `uid` parameter, the master folder itself
+    is exported if it is omitted.
+
+    """
+
+    def reply(self):
+        if LOG_KEY not in IAnnotations(self.context):
+            raise NotFound('Replication is not enabled for this folder.')
+        uid = self.request.form.get('uid') or None
+        try:
+            return LocalSource(self.context).export(uid)
+        except LookupError as e:
+            raise NotFound(str(e))
@@ -0,0 +1,102 @@
+from collective.mirror.mirror import get_brain_for_language
+from collective.mirror.mirror import get_brain_in_navroot
+from collective.mirror.mirror import get_brain_in_tree
+from collective.mirror.mirror import get_brains_for_language
+from collective.mirror.mirror import get_brains_in_navroot
+from collective.mirror.mirror import get_brains_in_tree
+from collective.mirror.mirror import get_objects
+from collective.mirror.mirror import MirrorNotFound
+from plone import api
+from plone.restapi.services import Service
+from zExceptions import BadRequest
+from zExceptions import NotFound
+
+
+class MirrorResolveGet(Service):
+    """Resolve many objects to their copies in a particular mirror, language or navroot.
+
+    Objects are passed by UID as the `uids` parameter, which may be repeated. They may
+    be given as seen at any of their mirror (or master) locations. The target is one of
+
+    * `mirror`: the UUID of a mirror or a mirrored folder (master),
+    * `language`: a language code, or an empty value for the master folder,
+    * neither of these: the navigation root of the context the service is called on.
+
+    All objects are looked up by one catalog query and then resolved by one catalog
+    query per mirrored tree. Objects that cannot be resolved are returned as null. An
+    invalid target results in a 400 response, and a context whose navigation roots
+    don't lead to any mirror of an object's tree results in a 404 response.
+
+    """
+
+    def reply(self):
+        uids = self.request.form.get('uids', [])
+        if isinstance(uids, str):
+            uids = [uids]
+
+        resolve_one, resolve_many, target = self._target()
+        cat = api.portal.get_tool('portal_catalog')
+        sources = {brain.UID: brain for brain in cat(UID=uids)} if uids else {}
+        found = [uid for uid in uids if uid in sources]
+        objs = dict(zip(found, get_objects([sources[uid] for uid in found])))
+
+        try:
+            try:
+                brains = resolve_many(list(objs.values()), target)
+            except MirrorNotFound:
+                raise
+            except LookupError:
+                brains = [
+                    self._resolve_one(resolve_one, obj, target)
+                    for obj in objs.values()
+                ]
+        except ValueError as e:
+            raise BadRequest(str(e))
+        except MirrorNotFound as e:
+            # No mirror shares a navigation root with the context.
+            raise NotFound(str(e))
+        resolved = dict(zip(objs, brains))
+
+        # Lookups inside mirrored trees are unrestricted, so filter by permission.
+        resolved_uids = [brain.UID for brain in resolved.values() if brain is not None]
+        visible = (
+            {brain.UID for brain in cat(UID=resolved_uids)} if resolved_uids else set()
+        )
+
+        return {
+            '@id': f'{self.context.absolute_url()}/@mirror-resolve',
+            'items': [
+                self._item(uid, brain)
+                if (brain := resolved.get(uid)) is not None and brain.UID in visible
+                else None
+                for uid in uids
+            ],
+        }
+
+    def _item(self, uid, brain):
+        return {
+            '@id': brain.getURL(),
+            'UID': uid,
+            'resolved_UID': brain.UID,
+            'path': brain.getPath(),
+        }
+
+    def _target(self):
+        form = self.request.form
+        if mirror_uid := form.get('mirror'):
+            target = api.content.get(UID=mirror_uid)
+            if target is None:
+                raise BadRequest(f'No mirror found for UID {mirror_uid}.')
+            return get_brain_in_tree, get_brains_in_tree, target
+        if 'language' in form:
+            language = form['language'] or None
+            return get_brain_for_language, get_brains_for_language, language
+        return get_brain_in_navroot, get_brains_in_navroot, self.context
+
+    def _resolve_one(self, resolve_one, obj, target):
+        try:
+            return resolve_one(obj, target)
+        except MirrorNotFound:
+            raise
+        except LookupError:
+            return None
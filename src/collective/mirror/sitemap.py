@@ -0,0 +1,173 @@
+"""Streaming sitemaps and link inventories that cover mirrored trees."""
+
+from .mirror import get_tree_paths
+from .mirror import MirrorInfo
+from .mirror import MIRRORS_ATTR
+from Acquisition import aq_base
+from collections import namedtuple
+from itertools import islice
+from plone import api
+from plone.uuid.interfaces import IUUID
+from xml.sax.saxutils import escape
+from zope.globalrequest import getRequest
+from ZTUtils.Lazy import LazyMap
+
+import csv
+import gzip
+import io
+
+
+BATCH_SIZE = 1000
+
+SITEMAP_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+
+SITEMAP_FOOTER = '</urlset>\n'
+
+Link = namedtuple('Link', ('path', 'url', 'uid', 'modified', 'portal_type'))
+
+
+def mirrored_trees():
+    """Map the paths of all master folders to the paths and UUIDs of their mirrors.
+
+    The mirrors' locations are looked up from the mirror ids recorded on each master.
+
+    """
+    cat = api.portal.get_tool('portal_catalog')
+    trees = {}
+    for brain in cat.unrestrictedSearchResults(portal_type='mirror'):
+        master = brain._unrestrictedGetObject().master
+        if master is None:
+            continue
+        master_path = '/'.join(master.getPhysicalPath())
+        if master_path not in trees:
+            info = MirrorInfo(
+                aq_base(master), None, list(getattr(master, MIRRORS_ATTR, ()))
+            )
+            paths = get_tree_paths(info)
+            paths.pop(IUUID(master), None)
+            trees[master_path] = {path: uuid for uuid, path in paths.items()}
+    return trees
+
+
+def iter_links(**query):
+    """Yield the links to all content found by a catalog query, including mirrors.
+
+    Mirrored content is found via its master copies only, and links to the copies in
+    all mirrors are derived by re-basing their paths. So the master tree is only
+    searched once, and mirrors are covered even if their catalog records lag behind.
+    Links into a mirror are only included if the current user may view the mirror;
+    otherwise, visibility is that of the master copies.
+
+    The query is run once, and brains are built from its record ids in batches without
+    being kept, see iter_brains. The ZODB cache is garbage-collected in between
+    batches, so memory use doesn't grow with the number of links.
+
+    """
+    trees = mirrored_trees()
+    mirror_paths = {path for mirrors in trees.values() for path in mirrors}
+    cat = api.portal.get_tool('portal_catalog')
+    mirror_ids = [uuid for mirrors in trees.values() for uuid in mirrors.values()]
+    visible = set()
+    if mirror_ids:
+        visible.update(brain.getPath() for brain in cat.searchResults(UID=mirror_ids))
+    path_to_url = _path_to_url()
+
+    for brain in iter_brains(cat, cat.searchResults(**query)):
+        path = brain.getPath()
+        root = _tree_root(path, trees, mirror_paths)
+        if root in mirror_paths:
+            continue
+
+        yield Link(
+            path, path_to_url(path), brain.UID, brain.modified, brain.portal_type
+        )
+        if root is None:
+            continue
+        root_length = len(root)
+        subpath = path[root_length:]
+        for mirror_path, mirror_id in trees[root].items():
+            if mirror_path not in visible:
+                continue
+            mirror_copy_path = mirror_path + subpath
+            yield Link(
+                mirror_copy_path,
+                path_to_url(mirror_copy_path),
+                f'{brain.UID}@{mirror_id}',
+                brain.modified,
+                brain.portal_type,
+            )
+
+
+def iter_brains(cat, results):
+    """Yield the brains of a catalog search result without keeping them.
+
+    Lazy results keep every brain they have built, so rather than iterating over the
+    result, brains are built from the record ids it maps, in batches with the ZODB
+    cache being garbage-collected in between. Results that don't map record ids, such
+    as concatenated ones, are iterated over as usual.
+
+    """
+    if type(results) is not LazyMap:
+        yield from results
+        return
+
+    build = results._func
+    for count, rid in enumerate(islice(results._seq, len(results))):
+        if count and not count % BATCH_SIZE:
+            cat._p_jar.cacheGC()
+        yield build(rid)
+
+
+def _path_to_url():
+    """Return a function turning physical paths into URLs, with or without a request.
+
+    Scripts may run without a request, in which case URLs are based on the portal's.
+
+    """
+    request = getRequest()
+    if request is not None:
+        return request.physicalPathToURL
+
+    portal = api.portal.get()
+    start = len('/'.join(portal.getPhysicalPath()))
+    portal_url = portal.absolute_url()
+    return lambda path: portal_url + path[start:]
+
+
+def _tree_root(path, trees, mirror_paths):
+    """Find the master or mirror folder a path lies strictly inside of, if any."""
+    parts = path.split('/')
+    for end in range(len(parts) - 1, 1, -1):
+        prefix = '/'.join(parts[:end])
+        if prefix in trees or prefix in mirror_paths:
+            return prefix
+
+
+def write_sitemap(fileobj, links):
+    """Write a gzipped XML sitemap of the links to a file incrementally."""
+    with gzip.GzipFile(fileobj=fileobj, mode='wb') as gz:
+        out = io.TextIOWrapper(gz, encoding='utf-8')
+        out.write(SITEMAP_HEADER)
+        for link in links:
+            out.write(f'<url>\n  <loc>{escape(link.url)}</loc>\n')
+            if link.modified:
+                out.write(f'  <lastmod>{link.modified.ISO8601()}</lastmod>\n')
+            out.write('</url>\n')
+        out.write(SITEMAP_FOOTER)
+        out.flush()
+        out.detach()
+
+
+def write_link_inventory(fileobj, links):
+    """Write a gzipped CSV inventory of the links to a file incrementally."""
+    with gzip.GzipFile(fileobj=fileobj, mode='wb') as gz:
+        out = io.TextIOWrapper(gz, encoding='utf-8', newline='')
+        writer = csv.writer(out)
+        writer.writerow(('path', 'url', 'UID'))
+        for link in links:
+            writer.writerow((link.path, link.url, link.uid))
+        out.flush()
+        out.detach()
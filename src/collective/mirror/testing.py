@@ -1,3 +1,4 @@
+from Acquisition import aq_parent
 from plone.app.contenttypes.testing import PLONE_APP_CONTENTTYPES_FIXTURE
 from plone.app.robotframework.testing import REMOTE_LIBRARY_BUNDLE_FIXTURE
 from plone.app.testing import applyProfile
@@ -29,12 +30,40 @@ class CollectiveMirrorLayer(PloneSandboxLayer):
 COLLECTIVE_MIRROR_FIXTURE = CollectiveMirrorLayer()
 
 
+class CollectiveMirrorReplicationLayer(PloneSandboxLayer):
+    """Adds a second Plone site to replicate content to."""
+
+    defaultBases = (COLLECTIVE_MIRROR_FIXTURE,)
+
+    def setUpPloneSite(self, portal):
+        from Products.CMFPlone.factory import addPloneSite
+
+        addPloneSite(
+            aq_parent(portal),
+            'replica',
+            extension_ids=(
+                'plone.app.contenttypes:default',
+                'collective.mirror:default',
+            ),
+            setup_content=False,
+        )
+
+
+COLLECTIVE_MIRROR_REPLICATION_FIXTURE = CollectiveMirrorReplicationLayer()
+
+
 COLLECTIVE_MIRROR_INTEGRATION_TESTING = IntegrationTesting(
     bases=(COLLECTIVE_MIRROR_FIXTURE,),
     name='CollectiveMirrorLayer:IntegrationTesting',
 )
 
 
+COLLECTIVE_MIRROR_REPLICATION_INTEGRATION_TESTING = IntegrationTesting(
+    bases=(COLLECTIVE_MIRROR_REPLICATION_FIXTURE,),
+    name='CollectiveMirrorReplicationLayer:IntegrationTesting',
+)
+
+
 COLLECTIVE_MIRROR_FUNCTIONAL_TESTING = FunctionalTesting(
     bases=(COLLECTIVE_MIRROR_FIXTURE,),
     name='CollectiveMirrorLayer:FunctionalTesting',
@@ -0,0 +1,242 @@
+"""Tests for attaching mirrors to master folders."""
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.mirror import attach_mirrors
+from collective.mirror.mirror import MIRRORS_ATTR
+from collective.mirror.mirror import swap_master
+from collective.mirror.testing import COLLECTIVE_MIRROR_FUNCTIONAL_TESTING
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from plone.protect.authenticator import createToken
+from plone.uuid.interfaces import IUUID
+from unittest import mock
+from zExceptions import Forbidden
+from zExceptions import NotFound
+from zope.interface import alsoProvides
+
+import transaction
+import unittest
+
+
+class TestAttachMirrors(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        folder = api.content.create(self.master, 'Folder', 'folder')
+        api.content.create(folder, 'Document', 'doc')
+        api.content.create(self.master, 'Document', 'doc')
+        self.mirrors = [
+            api.content.create(self.portal, 'mirror', f'mirror{i}') for i in range(3)
+        ]
+        self.catalog = api.portal.get_tool('portal_catalog')
+
+    def test_attach_mirrors(self):
+        count = attach_mirrors(self.master, self.mirrors, chunk_size=2)
+        self.assertEqual(count, 9)
+        self.assertEqual(
+            list(getattr(self.master, MIRRORS_ATTR)),
+            [IUUID(mirror) for mirror in self.mirrors],
+        )
+        for mirror in self.mirrors:
+            self.assertEqual(mirror.master, self.master)
+            brains = self.catalog.unrestrictedSearchResults(
+                path='/'.join(mirror.getPhysicalPath()), portal_type='Document'
+            )
+            self.assertEqual(
+                sorted(brain.getPath() for brain in brains),
+                [f'/plone/{mirror.id}/doc', f'/plone/{mirror.id}/folder/doc'],
+            )
+            for brain in brains:
+                self.assertTrue(brain.UID.endswith(f'@{IUUID(mirror)}'))
+
+    def test_attach_no_mirrors(self):
+        self.assertEqual(attach_mirrors(self.master, []), 0)
+
+
+class TestAttachMirrorsView(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        alsoProvides(self.request, ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        api.content.create(self.master, 'Document', 'doc')
+        self.other = api.content.create(self.portal, 'Folder', 'other')
+        self.mirrors = [
+            api.content.create(self.portal, 'mirror', f'mirror{i}') for i in range(2)
+        ]
+        self.attached = api.content.create(
+            self.portal, 'mirror', 'attached', master=self.other
+        )
+
+    def view(self, context=None):
+        return api.content.get_view(
+            'attach-mirrors', context or self.master, self.request
+        )
+
+    def submit(self, mirrors, authenticate=True):
+        self.request.method = 'POST'
+        self.request.form.update(
+            {'form.submitted': '1', 'mirrors': [IUUID(mirror) for mirror in mirrors]}
+        )
+        if authenticate:
+            self.request.form['_authenticator'] = createToken()
+        return self.view()()
+
+    def test_candidates(self):
+        self.assertEqual(
+            [brain.getPath() for brain in self.view().candidates()],
+            ['/plone/mirror0', '/plone/mirror1'],
+        )
+
+    def test_attach(self):
+        self.submit(self.mirrors)
+        for mirror in self.mirrors:
+            self.assertEqual(mirror.master, self.master)
+            self.assertEqual(list(mirror.objectIds()), ['doc'])
+        self.assertEqual(self.view().candidates(), [])
+
+    def test_single_transaction(self):
+        with mock.patch('transaction.commit') as commit:
+            self.submit(self.mirrors)
+        commit.assert_not_called()
+
+    def test_redirect(self):
+        self.submit(self.mirrors[:1])
+        self.assertEqual(self.request.response.status, 302)
+        self.assertEqual(
+            self.request.response.getHeader('location'), self.master.absolute_url()
+        )
+
+    def test_authenticator_required(self):
+        with self.assertRaises(Forbidden):
+            self.submit(self.mirrors, authenticate=False)
+        for mirror in self.mirrors:
+            self.assertIsNone(mirror.master)
+
+    def test_attached_mirrors_left_alone(self):
+        self.submit([self.mirrors[0], self.attached])
+        self.assertEqual(self.mirrors[0].master, self.master)
+        self.assertEqual(self.attached.master, self.other)
+        self.assertEqual(
+            list(getattr(self.master, MIRRORS_ATTR)), [IUUID(self.mirrors[0])]
+        )
+
+    def test_not_available_for_mirrors(self):
+        with self.assertRaises(NotFound):
+            self.view(self.attached)()
+
+    def test_not_available_in_mirrored_tree(self):
+        folder = api.content.create(self.other, 'Folder', 'folder')
+        with self.assertRaises(NotFound):
+            self.view(folder)()
+
+
+class TestSwapMaster(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.old = api.content.create(self.portal, 'Folder', 'old')
+        api.content.create(self.old, 'Document', 'shared')
+        api.content.create(self.old, 'Document', 'gone')
+        self.new = api.content.create(self.portal, 'Folder', 'new')
+        api.content.create(self.new, 'Document', 'shared')
+        api.content.create(self.new, 'Document', 'added')
+        self.mirror = api.content.create(self.portal, 'mirror', 'mirror')
+        attach_mirrors(self.old, [self.mirror])
+        self.catalog = api.portal.get_tool('portal_catalog')
+
+    def paths_below(self, obj):
+        prefix = '/'.join(obj.getPhysicalPath())
+        return {
+            brain.getPath()
+            for brain in self.catalog.unrestrictedSearchResults(path=prefix)
+        } - {prefix}
+
+    def test_swap_master(self):
+        count = swap_master(self.mirror, self.new)
+        self.assertEqual(count, 2)
+        self.assertEqual(self.mirror.master, self.new)
+        self.assertEqual(sorted(self.mirror.objectIds()), ['added', 'shared'])
+        self.assertEqual(
+            self.paths_below(self.mirror),
+            {'/plone/mirror/added', '/plone/mirror/shared'},
+        )
+        self.assertEqual(list(getattr(self.old, MIRRORS_ATTR)), [])
+        self.assertEqual(list(getattr(self.new, MIRRORS_ATTR)), [IUUID(self.mirror)])
+
+    def test_swap_keeps_old_master_indexed(self):
+        swap_master(self.mirror, self.new)
+        self.assertEqual(
+            self.paths_below(self.old), {'/plone/old/gone', '/plone/old/shared'}
+        )
+
+    def test_shared_record_belongs_to_new_master(self):
+        swap_master(self.mirror, self.new)
+        brain = self.catalog.unrestrictedSearchResults(path='/plone/mirror/shared')[0]
+        self.assertEqual(brain.UID, f'{IUUID(self.new.shared)}@{IUUID(self.mirror)}')
+
+
+class TestSwapMasterIsolation(unittest.TestCase):
+
+    # Other connections only see committed state.
+    layer = COLLECTIVE_MIRROR_FUNCTIONAL_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.old = api.content.create(self.portal, 'Folder', 'old')
+        self.shared = api.content.create(self.old, 'Document', 'shared')
+        api.content.create(self.old, 'Document', 'gone')
+        self.new = api.content.create(self.portal, 'Folder', 'new')
+        api.content.create(self.new, 'Document', 'shared')
+        api.content.create(self.new, 'Document', 'added')
+        self.mirror = api.content.create(self.portal, 'mirror', 'mirror')
+        attach_mirrors(self.old, [self.mirror])
+        transaction.commit()
+        self.checked = 0
+
+    def check_committed_state(self):
+        connection = self.layer['app']._p_jar.db().open()
+        try:
+            portal = connection.root()['Application']['plone']
+            catalog = portal.portal_catalog._catalog
+            paths = set(catalog.uids.keys('/plone/mirror/', '/plone/mirror/\uffff'))
+            self.assertEqual(paths, {'/plone/mirror/gone', '/plone/mirror/shared'})
+            for path in paths:
+                self.assertIsNotNone(portal.unrestrictedTraverse(path))
+            brain = catalog[catalog.uids['/plone/mirror/shared']]
+            self.assertEqual(
+                brain.UID, f'{IUUID(self.shared)}@{IUUID(self.mirror)}'
+            )
+            self.checked += 1
+        finally:
+            connection.close()
+
+    def test_nothing_visible_between_chunks(self):
+        savepoint = transaction.savepoint
+
+        def check(*args, **kw):
+            result = savepoint(*args, **kw)
+            self.check_committed_state()
+            return result
+
+        with mock.patch('transaction.savepoint', side_effect=check):
+            swap_master(self.mirror, self.new, chunk_size=1)
+        self.assertGreater(self.checked, 0)
+        transaction.commit()
+        self.assertEqual(sorted(self.mirror.objectIds()), ['added', 'shared'])
@@ -0,0 +1,138 @@
+"""Tests for process-wide caching of mirror lookups."""
+from Acquisition import aq_base
+from collective.mirror.cache import bump_tree_version
+from collective.mirror.cache import tree_version
+from collective.mirror.cache import VersionedLRUCache
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.mirror import attach_mirrors
+from collective.mirror.mirror import detach_mirrors
+from collective.mirror.mirror import NOT_MIRRORED
+from collective.mirror.mirror import placeless_info_cache
+from collective.mirror.mirror import placeless_mirror_info
+from collective.mirror.testing import COLLECTIVE_MIRROR_FUNCTIONAL_TESTING
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from unittest import mock
+from zope.interface import alsoProvides
+
+import transaction
+import unittest
+
+
+class TestVersionedLRUCache(unittest.TestCase):
+    def test_entries_valid_for_their_version(self):
+        cache = VersionedLRUCache(10)
+        cache.set('uuid', 1, 'oid')
+        self.assertEqual(cache.get('uuid', 1), 'oid')
+        self.assertIsNone(cache.get('uuid', 2))
+
+    def test_least_recently_used_dropped(self):
+        cache = VersionedLRUCache(2)
+        cache.set('a', 1, 'A')
+        cache.set('b', 1, 'B')
+        cache.get('a', 1)
+        cache.set('c', 1, 'C')
+        self.assertEqual(cache.get('a', 1), 'A')
+        self.assertIsNone(cache.get('b', 1))
+        self.assertEqual(cache.get('c', 1), 'C')
+
+    def test_default(self):
+        marker = object()
+        self.assertIs(VersionedLRUCache(1).get('a', 1, marker), marker)
+
+    def test_no_version_not_cached(self):
+        cache = VersionedLRUCache(10)
+        cache.set('a', None, 'A')
+        self.assertIsNone(cache.get('a', None))
+        cache.set('a', 1, 'A')
+        self.assertIsNone(cache.get('a', None))
+
+
+class TestPlacelessMirrorInfo(unittest.TestCase):
+
+    # Only committed versions are cached by.
+    layer = COLLECTIVE_MIRROR_FUNCTIONAL_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.doc = api.content.create(self.master, 'Document', 'doc')
+        self.mirror = api.content.create(
+            self.portal, 'mirror', 'mirror', master=self.master
+        )
+        self.other = api.content.create(self.portal, 'Folder', 'other')
+        api.portal.get_tool('portal_catalog').clearFindAndRebuild()
+        transaction.commit()
+        placeless_info_cache.clear()
+
+    def lookup(self, obj):
+        """Look up an object without parents, return its info and the queries made."""
+        cat = api.portal.get_tool('portal_catalog')
+        with mock.patch.object(
+            cat, 'unrestrictedSearchResults', wraps=cat.unrestrictedSearchResults
+        ) as search:
+            info = placeless_mirror_info(aq_base(obj))
+        return info, search.call_count
+
+    def test_cache_hit(self):
+        info, queries = self.lookup(self.doc)
+        self.assertIs(info.master, aq_base(self.master))
+        self.assertEqual(queries, 1)
+        info, queries = self.lookup(self.doc)
+        self.assertIs(info.master, aq_base(self.master))
+        self.assertEqual(queries, 0)
+
+    def test_not_mirrored_cached(self):
+        self.assertEqual(self.lookup(self.other), (NOT_MIRRORED, 1))
+        self.assertEqual(self.lookup(self.other), (NOT_MIRRORED, 0))
+
+    def test_invalidated_on_attach(self):
+        self.lookup(self.doc)
+        mirror = api.content.create(self.portal, 'mirror', 'new')
+        attach_mirrors(self.master, [mirror])
+        info, queries = self.lookup(self.doc)
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(info.mirror_ids), 2)
+
+    def test_invalidated_on_detach(self):
+        self.lookup(self.doc)
+        detach_mirrors(self.master)
+        self.assertEqual(self.lookup(self.doc), (NOT_MIRRORED, 1))
+
+    def test_invalidated_on_move(self):
+        self.lookup(self.doc)
+        api.content.move(self.doc, self.other)
+        self.assertEqual(self.lookup(self.doc), (NOT_MIRRORED, 1))
+
+    def test_invalidated_on_move_into_tree(self):
+        doc = api.content.create(self.other, 'Document', 'other-doc')
+        transaction.savepoint(optimistic=True)
+        self.lookup(doc)
+        doc = api.content.move(doc, self.master)
+        info, queries = self.lookup(doc)
+        self.assertEqual(queries, 1)
+        self.assertIs(info.master, aq_base(self.master))
+
+    def test_invalidated_on_delete(self):
+        self.lookup(self.doc)
+        api.content.delete(self.doc, check_linkintegrity=False)
+        self.assertEqual(self.lookup(self.doc), (NOT_MIRRORED, 1))
+
+    def test_not_cached_while_version_uncommitted(self):
+        bump_tree_version()
+        self.assertIsNone(tree_version())
+        transaction.savepoint(optimistic=True)
+        self.assertIsNone(tree_version())
+        self.assertEqual(self.lookup(self.doc)[1], 1)
+        self.assertEqual(self.lookup(self.doc)[1], 1)
+
+    def test_aborted_version_not_trusted(self):
+        bump_tree_version()
+        self.lookup(self.doc)
+        transaction.abort()
+        api.content.move(self.doc, self.other)
+        transaction.commit()
+        self.assertEqual(self.lookup(self.portal['other']['doc'])[0], NOT_MIRRORED)
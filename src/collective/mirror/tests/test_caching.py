@@ -0,0 +1,51 @@
+"""Tests for mirror-aware cache purging."""
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from z3c.caching.interfaces import IPurgePaths
+from zope.component import getAdapter
+from zope.interface import alsoProvides
+
+import unittest
+
+
+class TestMirrorPurgePaths(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.doc = api.content.create(self.master, 'Document', 'doc')
+        api.content.create(self.portal, 'mirror', 'mirror1', master=self.master)
+        api.content.create(self.portal, 'mirror', 'mirror2', master=self.master)
+        api.portal.get_tool('portal_catalog').clearFindAndRebuild()
+
+    def purge_paths(self, obj):
+        return getAdapter(obj, IPurgePaths, 'collective.mirror').getRelativePaths()
+
+    def test_copies_purged_from_master(self):
+        paths = self.purge_paths(self.doc)
+        for mirror in ('mirror1', 'mirror2'):
+            self.assertIn(f'/plone/{mirror}/doc', paths)
+            self.assertIn(f'/plone/{mirror}/doc/view', paths)
+            self.assertIn(f'/plone/{mirror}', paths)
+        self.assertNotIn('/plone/master/doc', paths)
+
+    def test_copies_purged_from_mirror(self):
+        paths = self.purge_paths(self.portal['mirror1']['doc'])
+        self.assertIn('/plone/master/doc', paths)
+        self.assertIn('/plone/mirror2/doc', paths)
+        self.assertNotIn('/plone/mirror1/doc', paths)
+
+    def test_paths_unique(self):
+        paths = self.purge_paths(self.doc)
+        self.assertEqual(len(paths), len(set(paths)))
+
+    def test_unmirrored_content(self):
+        other = api.content.create(self.portal, 'Document', 'other')
+        self.assertEqual(self.purge_paths(other), [])
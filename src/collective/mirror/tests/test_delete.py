@@ -0,0 +1,99 @@
+"""Tests for deleting master folders that have mirrors."""
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.mirror import MIRRORS_ATTR
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from Products.CMFCore.indexing import processQueue
+from unittest import mock
+from zope.interface import alsoProvides
+
+import unittest
+
+
+class TestDeleteMaster(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        folder = api.content.create(self.master, 'Folder', 'folder')
+        api.content.create(folder, 'Document', 'doc')
+        self.mirrors = [
+            api.content.create(self.portal, 'mirror', f'mirror{i}', master=self.master)
+            for i in range(2)
+        ]
+        self.catalog = api.portal.get_tool('portal_catalog')
+        self.catalog.clearFindAndRebuild()
+
+    def paths_below(self, obj):
+        prefix = '/'.join(obj.getPhysicalPath())
+        return {
+            brain.getPath()
+            for brain in self.catalog.unrestrictedSearchResults(path=prefix)
+        } - {prefix}
+
+    def test_mirrors_indexed(self):
+        for mirror in self.mirrors:
+            self.assertEqual(len(self.paths_below(mirror)), 2)
+
+    def test_delete_master_detaches_mirrors(self):
+        api.content.delete(self.master, check_linkintegrity=False)
+        for mirror in self.mirrors:
+            self.assertIsNone(mirror.master)
+            self.assertEqual(list(mirror.objectIds()), [])
+            self.assertEqual(getattr(mirror, MIRRORS_ATTR), [])
+            self.assertEqual(self.paths_below(mirror), set())
+
+    def test_delete_master_skips_reindexing_content(self):
+        with mock.patch('collective.mirror.mirror.reindex_mirrored') as reindex:
+            api.content.delete(self.master, check_linkintegrity=False)
+        reindex.assert_not_called()
+
+    def test_delete_master_uncatalogs_master_content(self):
+        api.content.delete(self.master, check_linkintegrity=False)
+        self.assertEqual(
+            len(self.catalog.unrestrictedSearchResults(portal_type='Document')), 0
+        )
+
+
+class TestDeleteMirroredContent(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.doc = api.content.create(self.master, 'Document', 'doc')
+        api.content.create(self.master, 'Document', 'other')
+        self.mirrors = [
+            api.content.create(self.portal, 'mirror', f'mirror{i}', master=self.master)
+            for i in range(2)
+        ]
+        self.catalog = api.portal.get_tool('portal_catalog')
+        self.catalog.clearFindAndRebuild()
+
+    def paths(self, obj_id):
+        return {
+            brain.getPath()
+            for brain in self.catalog.unrestrictedSearchResults(id=obj_id)
+        }
+
+    def test_delete_uncatalogs_all_copies(self):
+        self.assertEqual(len(self.paths('doc')), 3)
+        api.content.delete(self.mirrors[0]['doc'], check_linkintegrity=False)
+        self.assertEqual(self.paths('doc'), set())
+        self.assertEqual(len(self.paths('other')), 3)
+
+    def test_pending_reindex_does_not_recreate_records(self):
+        self.doc.title = 'Changed'
+        self.doc.reindexObject()
+        api.content.delete(self.doc, check_linkintegrity=False)
+        processQueue()
+        self.assertEqual(self.paths('doc'), set())
@@ -0,0 +1,62 @@
+"""Tests for dry-run estimates of mirror operations."""
+from collective.mirror.estimate import estimate_attach
+from collective.mirror.estimate import estimate_delete
+from collective.mirror.estimate import estimate_detach
+from collective.mirror.estimate import estimate_move
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from zope.interface import alsoProvides
+
+import unittest
+
+
+class TestEstimate(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.folder = api.content.create(self.master, 'Folder', 'folder')
+        for i in range(3):
+            api.content.create(self.folder, 'Document', f'doc{i}')
+        self.mirrors = [
+            api.content.create(self.portal, 'mirror', f'mirror{i}', master=self.master)
+            for i in range(2)
+        ]
+        self.other = api.content.create(self.portal, 'Folder', 'other')
+        api.portal.get_tool('portal_catalog').clearFindAndRebuild()
+
+    def test_attach(self):
+        mirror = api.content.create(self.portal, 'mirror', 'new')
+        result = estimate_attach(mirror, self.master)
+        self.assertEqual(result.objects, 4)
+        self.assertEqual(result.records_added, 4)
+        self.assertEqual(result.records_removed, 0)
+        self.assertGreater(result.seconds, 0)
+
+    def test_attach_replacing_master(self):
+        result = estimate_attach(self.mirrors[0], self.other)
+        self.assertEqual(result.records_added, 0)
+        self.assertEqual(result.records_removed, 4)
+
+    def test_detach(self):
+        result = estimate_detach(self.mirrors[0])
+        self.assertEqual(result.records_removed, 4)
+        self.assertEqual(result.records_added, 0)
+
+    def test_move_out_of_master(self):
+        result = estimate_move(self.folder, self.other)
+        self.assertEqual(result.objects, 4)
+        self.assertEqual(result.records_added, 4)
+        self.assertEqual(result.records_removed, 12)
+
+    def test_delete_master(self):
+        result = estimate_delete(self.master)
+        self.assertEqual(result.objects, 5)
+        self.assertEqual(result.records_removed, 13)
@@ -0,0 +1,159 @@
+"""Tests for the selection of indexes maintained for mirrored content."""
+from collective.mirror import indexing
+from collective.mirror.indexing import INDEXES_RECORD
+from collective.mirror.indexing import METADATA_RECORD
+from collective.mirror.indexing import search_in_tree
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.mirror import attach_mirrors
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from collective.mirror.upgrades import add_registry_records
+from DateTime import DateTime
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from unittest import mock
+from zope.event import notify
+from zope.interface import alsoProvides
+from zope.interface import noLongerProvides
+from zope.lifecycleevent import ObjectModifiedEvent
+
+import Missing
+import unittest
+
+
+class TestMirrorIndexes(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        api.portal.set_registry_record(INDEXES_RECORD, ['Title'])
+        api.portal.set_registry_record(METADATA_RECORD, ['Title'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        api.content.create(self.master, 'Document', 'doc', title='Needle')
+        self.mirror = api.content.create(
+            self.portal, 'mirror', 'mirror', master=self.master
+        )
+        self.catalog = api.portal.get_tool('portal_catalog')
+        self.catalog.clearFindAndRebuild()
+
+    def search(self, obj, **query):
+        return self.catalog(path='/'.join(obj.getPhysicalPath()), **query)
+
+    def test_excluded_index_not_maintained(self):
+        self.assertEqual(len(self.search(self.master, SearchableText='Needle')), 1)
+        self.assertEqual(len(self.search(self.mirror, SearchableText='Needle')), 0)
+
+    def test_selected_index_maintained(self):
+        self.assertEqual(len(self.search(self.mirror, Title='Needle')), 1)
+
+    def test_required_index_maintained(self):
+        self.assertEqual(len(self.search(self.mirror, portal_type='Document')), 1)
+
+    def test_excluded_metadata_not_stored(self):
+        (brain,) = self.search(self.mirror, portal_type='Document')
+        self.assertEqual(brain.Title, 'Needle')
+        self.assertIs(brain.Description, Missing.Value)
+
+    def test_reindex_respects_selection(self):
+        self.mirror['doc'].title = 'Haystack'
+        notify(ObjectModifiedEvent(self.mirror['doc']))
+        self.assertEqual(len(self.search(self.mirror, Title='Haystack')), 1)
+        self.assertEqual(len(self.search(self.master, SearchableText='Haystack')), 1)
+        self.assertEqual(len(self.search(self.mirror, SearchableText='Haystack')), 0)
+
+    def test_search_in_tree_maps_full_text_hits(self):
+        (brain,) = search_in_tree(self.mirror, SearchableText='Needle')
+        self.assertEqual(brain.getPath(), '/plone/mirror/doc')
+
+    def test_all_indexes_by_default(self):
+        api.portal.set_registry_record(INDEXES_RECORD, [])
+        self.catalog.clearFindAndRebuild()
+        self.assertEqual(len(self.search(self.mirror, SearchableText='Needle')), 1)
+
+    def test_rebuild_without_layer(self):
+        noLongerProvides(self.layer['request'], ICollectiveMirrorLayer)
+        self.catalog.clearFindAndRebuild()
+        self.assertEqual(len(self.search(self.mirror, Title='Needle')), 1)
+        self.assertEqual(len(self.search(self.mirror, SearchableText='Needle')), 0)
+
+    def test_selection_looked_up_once(self):
+        for i in range(3):
+            api.content.create(self.master, 'Document', f'doc{i}')
+        with mock.patch(
+            'collective.mirror.indexing.mirror_indexes',
+            wraps=indexing.mirror_indexes,
+        ) as lookup:
+            self.catalog.clearFindAndRebuild()
+        self.assertLessEqual(lookup.call_count, 2)
+
+    def test_effective_range_maintained(self):
+        self.master['doc'].expiration_date = DateTime('2000/01/01')
+        notify(ObjectModifiedEvent(self.master['doc']))
+        self.assertEqual(len(self.search(self.mirror, portal_type='Document')), 1)
+        self.assertEqual(
+            len(
+                self.search(
+                    self.mirror, portal_type='Document', effectiveRange=DateTime()
+                )
+            ),
+            0,
+        )
+
+
+class TestIndexesAndMetadataSeparate(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        api.content.create(
+            self.master, 'Document', 'doc', title='Needle', subject=('tag',)
+        )
+        self.catalog = api.portal.get_tool('portal_catalog')
+
+    def attach(self, indexes, metadata):
+        api.portal.set_registry_record(INDEXES_RECORD, indexes)
+        api.portal.set_registry_record(METADATA_RECORD, metadata)
+        mirror = api.content.create(self.portal, 'mirror', 'mirror')
+        attach_mirrors(self.master, [mirror])
+        return mirror
+
+    def search(self, obj, **query):
+        return self.catalog(path='/'.join(obj.getPhysicalPath()), **query)
+
+    def test_index_without_column(self):
+        mirror = self.attach(['Subject'], ['Title'])
+        (brain,) = self.search(mirror, Subject='tag')
+        self.assertEqual(brain.getPath(), '/plone/mirror/doc')
+
+    def test_column_without_index(self):
+        mirror = self.attach(['Title'], ['Subject'])
+        (brain,) = self.search(mirror, portal_type='Document')
+        self.assertEqual(brain.Subject, ('tag',))
+        self.assertIs(brain.Description, Missing.Value)
+        self.assertEqual(len(self.search(mirror, SearchableText='Needle')), 0)
+
+    def test_rebuild_keeps_selected_values(self):
+        mirror = self.attach(['Subject'], ['Title'])
+        self.catalog.clearFindAndRebuild()
+        (brain,) = self.search(mirror, Subject='tag')
+        self.assertEqual(brain.Title, 'Needle')
+
+
+class TestRegistryUpgrade(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def test_add_registry_records(self):
+        registry = self.layer['portal'].portal_registry
+        api.portal.set_registry_record(INDEXES_RECORD, ['Title'])
+        del registry.records[METADATA_RECORD]
+        add_registry_records(api.portal.get_tool('portal_setup'))
+        self.assertIn(METADATA_RECORD, registry.records)
+        self.assertEqual(api.portal.get_registry_record(INDEXES_RECORD), ['Title'])
@@ -0,0 +1,111 @@
+"""Tests for folder listings shared across mirrors."""
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.listing import get_listing
+from collective.mirror.listing import listing_cache
+from collective.mirror.testing import COLLECTIVE_MIRROR_FUNCTIONAL_TESTING
+from DateTime import DateTime
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from plone.uuid.interfaces import IUUID
+from unittest import mock
+from zope.event import notify
+from zope.interface import alsoProvides
+from zope.lifecycleevent import ObjectModifiedEvent
+
+import transaction
+import unittest
+
+
+class TestListing(unittest.TestCase):
+
+    # Listings are only cached once changes to their tree are committed.
+    layer = COLLECTIVE_MIRROR_FUNCTIONAL_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        listing_cache.clear()
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        folder = api.content.create(self.master, 'Folder', 'folder')
+        self.doc = api.content.create(folder, 'Document', 'doc', title='Doc')
+        self.mirror = api.content.create(
+            self.portal, 'mirror', 'mirror', master=self.master
+        )
+        api.portal.get_tool('portal_catalog').clearFindAndRebuild()
+        transaction.commit()
+
+    def test_rebased_onto_mirror(self):
+        (item,) = get_listing(self.mirror['folder'])
+        self.assertEqual(item['id'], 'doc')
+        self.assertEqual(item['title'], 'Doc')
+        self.assertEqual(item['path'], '/plone/mirror/folder/doc')
+        self.assertEqual(item['url'], 'http://nohost/plone/mirror/folder/doc')
+        self.assertEqual(item['UID'], f'{IUUID(self.doc)}@{IUUID(self.mirror)}')
+
+    def test_master(self):
+        (item,) = get_listing(self.master['folder'])
+        self.assertEqual(item['path'], '/plone/master/folder/doc')
+        self.assertEqual(item['UID'], IUUID(self.doc))
+
+    def test_shared_between_master_and_mirror(self):
+        get_listing(self.master['folder'])
+        with mock.patch('collective.mirror.listing._query_listing') as query:
+            (item,) = get_listing(self.mirror['folder'])
+        query.assert_not_called()
+        self.assertEqual(item['path'], '/plone/mirror/folder/doc')
+
+    def test_invalidated_by_changes(self):
+        get_listing(self.master['folder'])
+        api.content.create(self.master['folder'], 'Document', 'other')
+        ids = [item['id'] for item in get_listing(self.mirror['folder'])]
+        self.assertEqual(ids, ['doc', 'other'])
+
+    def test_invalidated_by_modifications_through_mirror(self):
+        get_listing(self.master['folder'])
+        doc = self.mirror['folder']['doc']
+        doc.title = 'Changed'
+        notify(ObjectModifiedEvent(doc))
+        (item,) = get_listing(self.master['folder'])
+        self.assertEqual(item['title'], 'Changed')
+
+    def test_not_invalidated_by_changes_elsewhere(self):
+        get_listing(self.master['folder'])
+        api.content.create(self.portal, 'Document', 'elsewhere')
+        with mock.patch('collective.mirror.listing._query_listing') as query:
+            get_listing(self.mirror['folder'])
+        query.assert_not_called()
+
+    def test_inactive_items_filtered(self):
+        self.doc.expiration_date = DateTime('2000/01/01')
+        notify(ObjectModifiedEvent(self.doc))
+        self.assertEqual(len(get_listing(self.master['folder'])), 1)
+
+        cat = api.portal.get_tool('portal_catalog')
+        with mock.patch.object(cat, 'allow_inactive', return_value=False):
+            self.assertEqual(get_listing(self.mirror['folder']), [])
+
+    def test_folder_listing(self):
+        view = api.content.get_view(
+            'folderListing', self.mirror['folder'], self.layer['request']
+        )
+        get_listing(self.master['folder'])
+        with mock.patch('collective.mirror.listing._query_listing') as query:
+            listing = view(batch=True, portal_type=['Document'])
+        query.assert_not_called()
+        self.assertEqual(
+            [item.getPath() for item in listing], ['/plone/mirror/folder/doc']
+        )
+        self.assertEqual(
+            [item.uuid() for item in listing],
+            [f'{IUUID(self.doc)}@{IUUID(self.mirror)}'],
+        )
+
+    def test_folder_listing_other_criteria(self):
+        view = api.content.get_view(
+            'folderListing', self.mirror['folder'], self.layer['request']
+        )
+        with mock.patch('collective.mirror.browser.listing.get_listing') as listing:
+            self.assertEqual(len(view(Title='Doc')), 1)
+        listing.assert_not_called()
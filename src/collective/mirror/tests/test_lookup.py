@@ -0,0 +1,122 @@
+"""Tests for looking up objects within mirrored content trees."""
+from Acquisition import aq_base
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.mirror import get_brain_in_tree
+from collective.mirror.mirror import get_brains_for_language
+from collective.mirror.mirror import get_brains_in_navroot
+from collective.mirror.mirror import get_brains_in_tree
+from collective.mirror.mirror import get_object_in_tree
+from collective.mirror.mirror import get_relations_in_navroot
+from collective.mirror.mirror import MirrorNotFound
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from plone import api
+from plone.app.layout.navigation.interfaces import INavigationRoot
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from z3c.relationfield import RelationValue
+from zope.component import getUtility
+from zope.interface import alsoProvides
+from zope.intid.interfaces import IIntIds
+from zope.location.interfaces import LocationError
+
+import unittest
+
+
+class TestLookup(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.docs = [
+            api.content.create(self.master, 'Document', f'doc{i}') for i in range(3)
+        ]
+        self.mirror = api.content.create(
+            self.portal, 'mirror', 'mirror', master=self.master
+        )
+        self.other = api.content.create(self.portal, 'Document', 'other')
+        api.portal.get_tool('portal_catalog').clearFindAndRebuild()
+
+    def test_object_in_tree(self):
+        obj = get_object_in_tree(self.docs[0], self.mirror)
+        self.assertEqual(obj.getPhysicalPath(), ('', 'plone', 'mirror', 'doc0'))
+
+    def test_brain_in_tree(self):
+        brain = get_brain_in_tree(self.docs[0], self.mirror)
+        self.assertEqual(brain.getPath(), '/plone/mirror/doc0')
+
+    def test_brains_in_tree_keep_order(self):
+        brains = get_brains_in_tree(list(reversed(self.docs)), self.mirror)
+        self.assertEqual(
+            [brain.getPath() for brain in brains],
+            ['/plone/mirror/doc2', '/plone/mirror/doc1', '/plone/mirror/doc0'],
+        )
+
+    def test_brains_in_tree_outside_tree(self):
+        with self.assertRaises(LocationError):
+            get_brains_in_tree([self.docs[0], self.other], self.mirror)
+
+    def test_brains_for_master(self):
+        mirrored = self.mirror['doc0']
+        brains = get_brains_for_language([mirrored, self.other], None)
+        self.assertEqual(
+            [brain.getPath() for brain in brains],
+            ['/plone/master/doc0', '/plone/other'],
+        )
+
+
+class TestRelations(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.docs = [
+            api.content.create(self.master, 'Document', f'doc{i}') for i in range(3)
+        ]
+        section = api.content.create(self.portal, 'Folder', 'section')
+        alsoProvides(section, INavigationRoot)
+        self.mirror = api.content.create(
+            section, 'mirror', 'mirror', master=self.master
+        )
+        self.other = api.content.create(self.portal, 'Document', 'other')
+        api.portal.get_tool('portal_catalog').clearFindAndRebuild()
+
+    def test_relations_in_mirror(self):
+        intids = getUtility(IIntIds)
+        relations = [RelationValue(intids.getId(doc)) for doc in self.docs[1:]]
+        relations.append(intids.getId(self.other))
+        relations.append(RelationValue(intids.getId(self.docs[0])))
+        targets = get_relations_in_navroot(relations, self.mirror['doc0'])
+        self.assertEqual(
+            ['/'.join(target.getPhysicalPath()) for target in targets],
+            [
+                '/plone/section/mirror/doc1',
+                '/plone/section/mirror/doc2',
+                '/plone/other',
+                '/plone/section/mirror/doc0',
+            ],
+        )
+
+    def test_relations_in_master(self):
+        intids = getUtility(IIntIds)
+        relations = [intids.getId(doc) for doc in self.docs]
+        targets = get_relations_in_navroot(relations, self.master)
+        self.assertEqual(
+            ['/'.join(target.getPhysicalPath()) for target in targets],
+            ['/plone/master/doc0', '/plone/master/doc1', '/plone/master/doc2'],
+        )
+
+    def test_no_mirror_by_navroot(self):
+        # A target outside the portal shares no navigation root with any tree.
+        with self.assertRaises(MirrorNotFound):
+            get_brains_in_navroot([self.docs[0]], aq_base(self.other))
+
+    def test_broken_relation(self):
+        self.assertEqual(get_relations_in_navroot([-1], self.master), [None])
@@ -0,0 +1,167 @@
+"""Memory footprint benchmarks for masters with increasing numbers of mirrors.
+
+These are not run by default. Run them with `bin/test -t test_memory -a 4`, setting
+COLLECTIVE_MIRROR_BENCHMARK_REPORT to the path of a CSV file in order to keep the
+numbers for comparison. Master sizes and mirror counts may be overridden as
+comma-separated lists in COLLECTIVE_MIRROR_BENCHMARK_SIZES and
+COLLECTIVE_MIRROR_BENCHMARK_MIRRORS.
+
+For each master size and number of mirrors, attaching the mirrors, editing one
+mirrored document and detaching the mirrors are measured:
+
+* seconds: wall-clock time, including processing the indexing queue and committing,
+* peak_kib: peak memory allocated by Python during the operation, as per tracemalloc,
+* records: catalog records after the operation,
+* objects: objects stored in the ZODB after the operation,
+* db_bytes: size of the ZODB storage after the operation,
+* cached: non-ghost objects in the ZODB connection caches after the operation.
+
+"""
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.mirror import attach_mirrors
+from collective.mirror.mirror import detach_mirrors
+from collective.mirror.testing import COLLECTIVE_MIRROR_FUNCTIONAL_TESTING
+from contextlib import contextmanager
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from Products.CMFCore.indexing import processQueue
+from zope.event import notify
+from zope.interface import alsoProvides
+from zope.lifecycleevent import ObjectModifiedEvent
+
+import csv
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import transaction
+import unittest
+
+
+BENCHMARK_TEST_LEVEL = 4
+
+FOLDER_SIZE = 100
+
+COLUMNS = (
+    'size',
+    'mirrors',
+    'phase',
+    'seconds',
+    'peak_kib',
+    'records',
+    'objects',
+    'db_bytes',
+    'cached',
+)
+
+
+def _numbers(name, default):
+    value = os.environ.get(name)
+    return tuple(int(n) for n in value.split(',')) if value else default
+
+
+class TestMemoryFootprint(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_FUNCTIONAL_TESTING
+    level = BENCHMARK_TEST_LEVEL
+
+    sizes = _numbers('COLLECTIVE_MIRROR_BENCHMARK_SIZES', (100, 1000))
+    mirror_counts = _numbers('COLLECTIVE_MIRROR_BENCHMARK_MIRRORS', (1, 5, 20, 50))
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.catalog = api.portal.get_tool('portal_catalog')
+        self.db = self.portal._p_jar.db()
+        self.rows = []
+
+    def build(self, size, count):
+        master = api.content.create(self.portal, 'Folder', f'master-{size}-{count}')
+        for i in range(0, size, FOLDER_SIZE):
+            folder = api.content.create(master, 'Folder', f'folder{i}')
+            for j in range(i + 1, min(i + FOLDER_SIZE, size)):
+                api.content.create(folder, 'Document', f'doc{j}')
+        mirrors = [
+            api.content.create(self.portal, 'mirror', f'mirror-{size}-{count}-{i}')
+            for i in range(count)
+        ]
+        processQueue()
+        transaction.commit()
+        self.portal._p_jar.cacheMinimize()
+        return master, mirrors
+
+    @contextmanager
+    def measure(self, size, count, phase):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+            processQueue()
+            transaction.commit()
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        self.rows.append(
+            {
+                'size': size,
+                'mirrors': count,
+                'phase': phase,
+                'seconds': round(seconds, 3),
+                'peak_kib': peak // 1024,
+                'records': len(self.catalog),
+                'objects': self.db.objectCount(),
+                'db_bytes': self.db.getSize(),
+                'cached': sum(cache['ngsize'] for cache in self.db.cacheDetailSize()),
+            }
+        )
+
+    def run_scenario(self, size, count):
+        master, mirrors = self.build(size, count)
+        with self.measure(size, count, 'attach'):
+            attach_mirrors(master, mirrors)
+
+        doc = master.objectValues()[-1].objectValues()[-1]
+        with self.measure(size, count, 'edit'):
+            doc.title = 'Edited'
+            notify(ObjectModifiedEvent(doc))
+
+        with self.measure(size, count, 'detach'):
+            detach_mirrors(master)
+
+        self.portal._p_jar.cacheMinimize()
+
+    def report(self):
+        header = dict(zip(COLUMNS, COLUMNS))
+        widths = [max(len(str(row[c])) for row in [header] + self.rows) for c in COLUMNS]
+        for row in [header] + self.rows:
+            line = '  '.join(str(row[c]).rjust(w) for c, w in zip(COLUMNS, widths))
+            print(line, file=sys.stderr)
+
+        path = os.environ.get('COLLECTIVE_MIRROR_BENCHMARK_REPORT')
+        if path:
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, COLUMNS)
+                writer.writeheader()
+                writer.writerows(self.rows)
+
+    def test_memory_footprint(self):
+        for size in self.sizes:
+            for count in self.mirror_counts:
+                self.run_scenario(size, count)
+        self.report()
+
+        # Each mirror adds one catalog record per object in the master's tree.
+        records = {(row['size'], row['mirrors'], row['phase']): row for row in self.rows}
+        for size in self.sizes:
+            for count in self.mirror_counts:
+                self.assertEqual(
+                    records[size, count, 'attach']['records']
+                    - records[size, count, 'detach']['records'],
+                    size * count,
+                )
@@ -0,0 +1,127 @@
+"""Tests for the ordering of mirrored content."""
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.mirror import POSITION_INDEX
+from collective.mirror.ordering import MergingOrder
+from collective.mirror.ordering import MirrorOrdering
+from collective.mirror.ordering import ORDERING_NAME
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from ZODB.POSException import ConflictError
+from zope.annotation.interfaces import IAnnotations
+from zope.interface import alsoProvides
+
+import unittest
+
+
+class TestPositionIndex(unittest.TestCase):
+    """Sites may replace the GopipIndex with an index that actually stores positions."""
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        for i in range(3):
+            api.content.create(self.master, 'Document', f'doc{i}')
+        self.mirror = api.content.create(
+            self.portal, 'mirror', 'mirror', master=self.master
+        )
+        self.catalog = api.portal.get_tool('portal_catalog')
+        self.catalog.delIndex(POSITION_INDEX)
+        self.catalog.addIndex(POSITION_INDEX, 'FieldIndex')
+        self.catalog.clearFindAndRebuild()
+
+    def ids_by_position(self, container):
+        brains = self.catalog.unrestrictedSearchResults(
+            path={'query': '/'.join(container.getPhysicalPath()), 'depth': 1},
+            sort_on=POSITION_INDEX,
+        )
+        return [brain.getId for brain in brains]
+
+    def test_reorder_in_master(self):
+        self.master.moveObjectsToTop(['doc2'])
+        for container in (self.master, self.mirror):
+            self.assertEqual(self.ids_by_position(container), ['doc2', 'doc0', 'doc1'])
+
+    def test_reorder_in_mirror(self):
+        self.mirror.moveObjectsToBottom(['doc0'])
+        for container in (self.master, self.mirror):
+            self.assertEqual(self.ids_by_position(container), ['doc1', 'doc2', 'doc0'])
+
+
+class TestMergingOrder(unittest.TestCase):
+    def resolve(self, old, committed, new):
+        return MergingOrder()._p_resolveConflict(
+            {'data': old}, {'data': committed}, {'data': new}
+        )['data']
+
+    def test_concurrent_appends(self):
+        self.assertEqual(
+            self.resolve(['a', 'b'], ['a', 'b', 'c'], ['a', 'b', 'd']),
+            ['a', 'b', 'c', 'd'],
+        )
+
+    def test_append_and_remove(self):
+        self.assertEqual(
+            self.resolve(['a', 'b', 'c'], ['a', 'c'], ['a', 'b', 'c', 'd']),
+            ['a', 'c', 'd'],
+        )
+
+    def test_append_and_reorder(self):
+        self.assertEqual(
+            self.resolve(['a', 'b', 'c'], ['c', 'a', 'b'], ['a', 'b', 'c', 'd']),
+            ['c', 'a', 'b', 'd'],
+        )
+
+    def test_concurrent_reorders(self):
+        with self.assertRaises(ConflictError):
+            self.resolve(['a', 'b', 'c'], ['c', 'a', 'b'], ['b', 'a', 'c'])
+
+    def test_insert_not_appended(self):
+        with self.assertRaises(ConflictError):
+            self.resolve(['a', 'b'], ['a', 'c', 'b'], ['a', 'b', 'd'])
+
+
+class TestSharedOrdering(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        for i in range(3):
+            api.content.create(self.master, 'Document', f'doc{i}')
+        self.mirror = api.content.create(
+            self.portal, 'mirror', 'mirror', master=self.master
+        )
+
+    def test_order_shared(self):
+        for folder in (self.master, self.mirror):
+            self.assertEqual(folder._ordering, ORDERING_NAME)
+            self.assertIsInstance(folder.getOrdering(), MirrorOrdering)
+        self.assertIs(
+            IAnnotations(self.master)[MirrorOrdering.ORDER_KEY],
+            IAnnotations(self.mirror)[MirrorOrdering.ORDER_KEY],
+        )
+
+    def test_positions_follow_order(self):
+        self.mirror.moveObjectsToTop(['doc2'])
+        api.content.create(self.master, 'Document', 'doc3')
+        for folder in (self.master, self.mirror):
+            ordering = folder.getOrdering()
+            self.assertEqual(ordering.idsInOrder(), ['doc2', 'doc0', 'doc1', 'doc3'])
+            self.assertEqual(ordering.getObjectPosition('doc3'), 3)
+            self.assertEqual(ordering.getObjectPosition('doc2'), 0)
+
+    def test_detach_keeps_master_order(self):
+        self.mirror.master = None
+        self.assertEqual(self.mirror.getOrdering().idsInOrder(), [])
+        self.assertEqual(
+            self.master.getOrdering().idsInOrder(), ['doc0', 'doc1', 'doc2']
+        )
@@ -0,0 +1,80 @@
+"""Tests for loading the objects of many catalog brains in one go."""
+from Acquisition import aq_base
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.mirror import get_objects
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from unittest import mock
+from zope.interface import alsoProvides
+
+import transaction
+import unittest
+
+
+class TestGetObjects(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.docs = [
+            api.content.create(self.master, 'Document', f'doc{i}') for i in range(3)
+        ]
+        self.mirror = api.content.create(
+            self.portal, 'mirror', 'mirror', master=self.master
+        )
+        self.catalog = api.portal.get_tool('portal_catalog')
+        self.catalog.clearFindAndRebuild()
+        transaction.savepoint(optimistic=True)
+
+    def brains(self):
+        return self.catalog.unrestrictedSearchResults(
+            portal_type='Document', sort_on='path'
+        )
+
+    def get_objects(self, brains, **kw):
+        jar = self.portal._p_jar
+        with mock.patch.object(jar, 'prefetch', create=True) as prefetch:
+            objs = get_objects(brains, **kw)
+        return objs, prefetch
+
+    def test_objects_in_order_of_brains(self):
+        brains = self.brains()
+        objs, prefetch = self.get_objects(brains)
+        self.assertEqual(
+            ['/'.join(obj.getPhysicalPath()) for obj in objs],
+            [brain.getPath() for brain in brains],
+        )
+        self.assertEqual(
+            [obj.getPhysicalPath()[-2] for obj in objs],
+            ['master'] * 3 + ['mirror'] * 3,
+        )
+
+    def test_unrestricted(self):
+        brains = self.brains()
+        objs, prefetch = self.get_objects(brains, restricted=False)
+        self.assertEqual(len(objs), 6)
+
+    def test_prefetch_target_ghosts_once(self):
+        for doc in self.docs:
+            doc._p_deactivate()
+        self.assertIsNone(self.docs[0]._p_changed)
+
+        objs, prefetch = self.get_objects(self.brains())
+        prefetch.assert_called_once()
+        (ghosts,) = prefetch.call_args[0]
+        self.assertEqual(
+            sorted(ghost._p_oid for ghost in ghosts),
+            sorted(aq_base(doc)._p_oid for doc in self.docs),
+        )
+
+    def test_loaded_objects_not_prefetched(self):
+        for doc in self.docs:
+            doc.getId()
+        objs, prefetch = self.get_objects(self.brains())
+        prefetch.assert_not_called()
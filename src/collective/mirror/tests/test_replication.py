@@ -0,0 +1,190 @@
+"""Tests for replicating master folders to another site."""
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.replication import CHECKPOINT_KEY
+from collective.mirror.replication import enable_replication
+from collective.mirror.replication import forget_replica
+from collective.mirror.replication import LocalSource
+from collective.mirror.replication import RemoteSource
+from collective.mirror.replication import replicate
+from collective.mirror.services.replication import MirrorChangesDelete
+from collective.mirror.testing import COLLECTIVE_MIRROR_REPLICATION_INTEGRATION_TESTING
+from plone import api
+from plone.app.testing import login
+from plone.app.testing import SITE_OWNER_NAME
+from plone.uuid.interfaces import IUUID
+from unittest import mock
+from zope.annotation.interfaces import IAnnotations
+from zope.component.hooks import setSite
+from zope.event import notify
+from zope.interface import alsoProvides
+from zope.lifecycleevent import ObjectModifiedEvent
+
+import transaction
+import unittest
+
+
+class TestReplication(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_REPLICATION_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.other = self.layer['app']['replica']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        login(self.layer['app'], SITE_OWNER_NAME)
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.folder = api.content.create(self.master, 'Folder', 'folder')
+        self.doc = api.content.create(self.folder, 'Document', 'doc', title='Doc')
+        self.log = enable_replication(self.master)
+        self.source = LocalSource(self.master)
+
+        setSite(self.other)
+        self.replica = api.content.create(self.other, 'Folder', 'replica')
+        setSite(self.portal)
+
+    def replicate(self, replica=None):
+        setSite(self.other)
+        try:
+            return replicate(self.source, replica or self.replica, batch_size=2)
+        finally:
+            setSite(self.portal)
+
+    def test_initial_copy(self):
+        self.replicate()
+        doc = self.replica['folder']['doc']
+        self.assertEqual(doc.title, 'Doc')
+        self.assertEqual(IUUID(doc), IUUID(self.doc))
+
+    def test_modify(self):
+        self.replicate()
+        self.doc.title = 'Changed'
+        notify(ObjectModifiedEvent(self.doc))
+        self.replicate()
+        self.assertEqual(self.replica['folder']['doc'].title, 'Changed')
+
+    def test_workflow_state(self):
+        self.replicate()
+        api.content.transition(self.doc, to_state='published')
+        self.replicate()
+        self.assertEqual(
+            api.content.get_state(self.replica['folder']['doc']), 'published'
+        )
+
+    def test_add_move_and_delete(self):
+        self.replicate()
+        api.content.create(self.master, 'Document', 'new')
+        api.content.move(self.doc, self.master)
+        api.content.delete(self.folder, check_linkintegrity=False)
+        self.replicate()
+        self.assertEqual(sorted(self.replica.objectIds()), ['doc', 'new'])
+
+    def test_resumes_after_checkpoint(self):
+        applied = self.replicate()
+        self.assertEqual(
+            IAnnotations(self.replica)[CHECKPOINT_KEY][self.source.key], len(self.log)
+        )
+        self.assertEqual(self.replicate(), 0)
+        api.content.create(self.master, 'Document', 'new')
+        self.assertGreater(self.replicate(), 0)
+        self.assertGreater(applied, 0)
+
+    def test_unreplicated_content_not_logged(self):
+        length = len(self.log)
+        api.content.create(self.portal, 'Document', 'other')
+        self.assertEqual(len(self.log), length)
+
+    def test_checkpoint_per_source(self):
+        self.replicate()
+        other_master = api.content.create(self.portal, 'Folder', 'other_master')
+        api.content.create(other_master, 'Document', 'other')
+        enable_replication(other_master)
+        setSite(self.other)
+        try:
+            replicate(LocalSource(other_master), self.replica)
+        finally:
+            setSite(self.portal)
+        checkpoints = IAnnotations(self.replica)[CHECKPOINT_KEY]
+        self.assertEqual(len(checkpoints), 2)
+        self.assertEqual(checkpoints[self.source.key], len(self.log))
+
+    def test_log_truncated_once_replicated(self):
+        self.replicate()
+        self.assertEqual(self.log.truncated(), len(self.log))
+        self.assertEqual(self.log.since(0), [])
+
+    def test_log_kept_for_lagging_replica(self):
+        setSite(self.other)
+        second = api.content.create(self.other, 'Folder', 'second')
+        setSite(self.portal)
+        self.replicate(second)
+        api.content.create(self.master, 'Document', 'new')
+        self.replicate()
+        self.assertEqual(self.log.truncated(), len(self.log) - 1)
+        self.replicate(second)
+        self.assertEqual(self.log.truncated(), len(self.log))
+        self.assertIn('new', second.objectIds())
+
+    def test_new_replica_after_truncation(self):
+        self.replicate()
+        setSite(self.other)
+        second = api.content.create(self.other, 'Folder', 'second')
+        setSite(self.portal)
+        self.replicate(second)
+        self.assertEqual(second['folder']['doc'].title, 'Doc')
+
+    def test_edits_through_mirror_logged(self):
+        mirror = api.content.create(self.portal, 'mirror', 'mirror', master=self.master)
+        self.replicate()
+        doc = mirror['folder']['doc']
+        doc.title = 'Changed'
+        notify(ObjectModifiedEvent(doc))
+        api.content.create(mirror, 'Document', 'new')
+        self.replicate()
+        self.assertEqual(self.replica['folder']['doc'].title, 'Changed')
+        self.assertIn('new', self.replica.objectIds())
+
+    def test_forget_lagging_replica(self):
+        setSite(self.other)
+        second = api.content.create(self.other, 'Folder', 'second')
+        setSite(self.portal)
+        self.replicate(second)
+        api.content.create(self.master, 'Document', 'new')
+        self.replicate()
+        setSite(self.other)
+        try:
+            forget_replica(self.source, second)
+        finally:
+            setSite(self.portal)
+        self.assertEqual(self.log.truncated(), len(self.log))
+        self.assertNotIn(self.source.key, IAnnotations(second)[CHECKPOINT_KEY])
+
+    def test_forget_replica_service(self):
+        setSite(self.other)
+        second = api.content.create(self.other, 'Folder', 'second')
+        setSite(self.portal)
+        self.replicate(second)
+        api.content.create(self.master, 'Document', 'new')
+        self.replicate()
+        request = self.layer['request']
+        request.form['replica'] = IUUID(second)
+        MirrorChangesDelete(self.master, request).reply()
+        self.assertEqual(self.log.truncated(), len(self.log))
+
+    def test_remote_acknowledges_after_commit(self):
+        source = RemoteSource('http://example.com/master')
+        with mock.patch.object(source, '_request') as request:
+            source.acknowledge('replica', 5)
+            request.assert_not_called()
+            hooks = [
+                (hook, args)
+                for hook, args, kws in transaction.get().getAfterCommitHooks()
+                if getattr(hook, '__self__', None) is source
+            ]
+            self.assertEqual(len(hooks), 1)
+            hook, args = hooks[0]
+            hook(False, *args)
+            request.assert_not_called()
+            hook(True, *args)
+            request.assert_called_once_with(
+                'POST', '@mirror-changes', body={'replica': 'replica', 'seq': 5}
+            )
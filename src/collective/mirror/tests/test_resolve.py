@@ -0,0 +1,87 @@
+"""Tests for the @mirror-resolve service."""
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.services.resolve import MirrorResolveGet
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from plone.uuid.interfaces import IUUID
+from zExceptions import BadRequest
+from zExceptions import NotFound
+from zope.interface import alsoProvides
+
+import unittest
+
+
+class TestResolveService(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        alsoProvides(self.request, ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.docs = [
+            api.content.create(self.master, 'Document', f'doc{i}') for i in range(2)
+        ]
+        self.mirror = api.content.create(
+            self.portal, 'mirror', 'mirror', master=self.master
+        )
+        self.other = api.content.create(self.portal, 'Document', 'other')
+        api.portal.get_tool('portal_catalog').clearFindAndRebuild()
+
+    def resolve(self, context=None, **form):
+        self.request.form.clear()
+        self.request.form.update(form)
+        return MirrorResolveGet(context or self.portal, self.request).reply()
+
+    def paths(self, result):
+        return [item and item['path'] for item in result['items']]
+
+    def test_resolve_in_mirror(self):
+        uids = [IUUID(doc) for doc in self.docs]
+        result = self.resolve(uids=uids, mirror=IUUID(self.mirror))
+        self.assertEqual(
+            self.paths(result), ['/plone/mirror/doc0', '/plone/mirror/doc1']
+        )
+        self.assertEqual(result['items'][0]['UID'], uids[0])
+        self.assertEqual(
+            result['items'][0]['resolved_UID'],
+            f'{uids[0]}@{IUUID(self.mirror)}',
+        )
+
+    def test_resolve_single_uid(self):
+        result = self.resolve(uids=IUUID(self.docs[0]), mirror=IUUID(self.mirror))
+        self.assertEqual(self.paths(result), ['/plone/mirror/doc0'])
+
+    def test_resolve_for_master(self):
+        uid = IUUID(self.mirror['doc0'])
+        result = self.resolve(uids=[uid, IUUID(self.other)], language='')
+        self.assertEqual(self.paths(result), ['/plone/master/doc0', '/plone/other'])
+
+    def test_unresolvable_are_null(self):
+        uids = [IUUID(self.other), IUUID(self.docs[0]), 'missing']
+        result = self.resolve(uids=uids, mirror=IUUID(self.mirror))
+        self.assertEqual(self.paths(result), [None, '/plone/mirror/doc0', None])
+
+    def test_unknown_mirror(self):
+        with self.assertRaises(BadRequest):
+            self.resolve(uids=[IUUID(self.docs[0])], mirror='missing')
+
+    def test_target_not_a_mirror(self):
+        with self.assertRaises(BadRequest):
+            self.resolve(uids=[IUUID(self.docs[0])], mirror=IUUID(self.other))
+
+    def test_no_mirror_by_navroot(self):
+        # The documents are visible, but neither the master nor the mirror is.
+        for obj in (self.master, self.mirror):
+            obj.manage_permission('View', ['Manager'], acquire=False)
+            obj.reindexObjectSecurity()
+        for doc in self.docs:
+            doc.manage_permission('View', ['Member', 'Manager'], acquire=False)
+            doc.reindexObjectSecurity()
+        setRoles(self.portal, TEST_USER_ID, ['Member'])
+        with self.assertRaises(NotFound):
+            self.resolve(uids=[IUUID(self.docs[0])])
@@ -6,6 +6,9 @@ from plone import api
 from plone.app.testing import setRoles
 from plone.app.testing import TEST_USER_ID
 
+import os
+import subprocess
+import sys
 import unittest
 
 
@@ -65,3 +68,22 @@ class TestUninstall(unittest.TestCase):
         from plone.browserlayer import utils
 
         self.assertNotIn(ICollectiveMirrorLayer, utils.registered_layers())
+
+
+class TestOptionalMultilingual(unittest.TestCase):
+    """Test that the add-on works without plone.app.multilingual."""
+
+    def test_mirror_imports_without_multilingual(self):
+        # Block the package in a fresh interpreter as if it weren't installed.
+        script = (
+            'import sys\n'
+            "sys.modules['plone.app.multilingual'] = None\n"
+            'import collective.mirror.mirror\n'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script],
+            env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        self.assertEqual(result.returncode, 0, result.stdout.decode('utf-8'))
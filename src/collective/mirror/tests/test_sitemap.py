@@ -0,0 +1,135 @@
+"""Tests for sitemaps and link inventories covering mirrored trees."""
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.sitemap import iter_links
+from collective.mirror.sitemap import write_link_inventory
+from collective.mirror.sitemap import write_sitemap
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from plone import api
+from plone.app.layout.navigation.interfaces import INavigationRoot
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from plone.uuid.interfaces import IUUID
+from unittest import mock
+from zope.interface import alsoProvides
+
+import gzip
+import io
+import unittest
+
+
+class TestSitemap(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.doc = api.content.create(self.master, 'Document', 'doc')
+        self.mirror = api.content.create(
+            self.portal, 'mirror', 'mirror', master=self.master
+        )
+        api.portal.get_tool('portal_catalog').clearFindAndRebuild()
+
+    def links(self):
+        return {link.path: link for link in iter_links(portal_type='Document')}
+
+    def test_links_to_master_and_mirrors(self):
+        links = self.links()
+        self.assertEqual(set(links), {'/plone/master/doc', '/plone/mirror/doc'})
+        link = links['/plone/mirror/doc']
+        self.assertEqual(link.url, 'http://nohost/plone/mirror/doc')
+        self.assertEqual(link.uid, f'{IUUID(self.doc)}@{IUUID(self.mirror)}')
+
+    def test_mirror_records_not_needed(self):
+        api.portal.get_tool('portal_catalog').uncatalog_object('/plone/mirror/doc')
+        self.assertIn('/plone/mirror/doc', self.links())
+
+    def test_batches(self):
+        for i in range(3):
+            api.content.create(self.master, 'Document', f'doc{i}')
+        cat = api.portal.get_tool('portal_catalog')
+        results = []
+
+        def search(**query):
+            result = search_results(**query)
+            if 'portal_type' in query:
+                results.append(result)
+            return result
+
+        search_results = cat.searchResults
+        with mock.patch('collective.mirror.sitemap.BATCH_SIZE', 2), mock.patch.object(
+            cat, 'searchResults', side_effect=search
+        ):
+            self.assertEqual(len(self.links()), 8)
+        self.assertEqual(len(results), 1)
+        # The lazy result hasn't kept any of the brains built from it.
+        self.assertEqual(len(results[0]._data), 0)
+
+    def test_links_without_request(self):
+        with mock.patch('collective.mirror.sitemap.getRequest', return_value=None):
+            links = self.links()
+        self.assertEqual(links['/plone/mirror/doc'].url, 'http://nohost/plone/mirror/doc')
+
+    def test_private_mirrors_excluded(self):
+        private = api.content.create(
+            self.portal, 'mirror', 'private', master=self.master
+        )
+        private.manage_permission('View', ['Manager'], acquire=False)
+        private.reindexObjectSecurity()
+        setRoles(self.portal, TEST_USER_ID, ['Member'])
+        self.assertEqual(set(self.links()), {'/plone/master/doc', '/plone/mirror/doc'})
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.assertIn('/plone/private/doc', self.links())
+
+    def test_write_sitemap(self):
+        out = io.BytesIO()
+        write_sitemap(out, iter_links(portal_type='Document'))
+        xml = gzip.decompress(out.getvalue()).decode('utf-8')
+        self.assertIn('<loc>http://nohost/plone/mirror/doc</loc>', xml)
+        self.assertTrue(xml.endswith('</urlset>\n'))
+
+    def test_write_link_inventory(self):
+        out = io.BytesIO()
+        write_link_inventory(out, iter_links(portal_type='Document'))
+        lines = gzip.decompress(out.getvalue()).decode('utf-8').splitlines()
+        self.assertEqual(lines[0], 'path,url,UID')
+        self.assertEqual(len(lines), 3)
+
+
+class TestSitemapView(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        alsoProvides(self.request, ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        api.portal.set_registry_record('plone.enable_sitemap', True)
+        api.portal.set_registry_record(
+            'plone.types_use_view_action_in_listings', ['File']
+        )
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        api.content.create(self.master, 'Document', 'doc')
+        api.content.create(self.master, 'File', 'file')
+        api.content.create(self.portal, 'mirror', 'mirror', master=self.master)
+        api.portal.get_tool('portal_catalog').clearFindAndRebuild()
+
+    def sitemap(self, context):
+        view = api.content.get_view('sitemap.xml.gz', context, self.request)
+        return gzip.decompress(view()).decode('utf-8')
+
+    def test_includes_mirrors_and_site_root(self):
+        xml = self.sitemap(self.portal)
+        self.assertIn('<loc>http://nohost/plone</loc>', xml)
+        self.assertIn('<loc>http://nohost/plone/mirror/doc</loc>', xml)
+        self.assertIn('<loc>http://nohost/plone/mirror/file/view</loc>', xml)
+
+    def test_filtered_by_navigation_root(self):
+        mirror = self.portal['mirror']
+        alsoProvides(mirror, INavigationRoot)
+        xml = self.sitemap(mirror)
+        self.assertIn('<loc>http://nohost/plone/mirror/doc</loc>', xml)
+        self.assertNotIn('<loc>http://nohost/plone/master/doc</loc>', xml)
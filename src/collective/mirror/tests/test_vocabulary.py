@@ -0,0 +1,102 @@
+"""Tests for the vocabulary of master folders to pick from."""
+from collective.mirror.interfaces import ICollectiveMirrorLayer
+from collective.mirror.mirror import get_objects
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from collective.mirror.vocabularies import CatalogVocabularyFactory
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from plone.uuid.interfaces import IUUID
+from unittest import mock
+from zope.interface import alsoProvides
+
+import unittest
+
+
+class TestMasterVocabulary(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        alsoProvides(self.layer['request'], ICollectiveMirrorLayer)
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        self.inner = api.content.create(self.master, 'Folder', 'inner')
+        api.content.create(self.master, 'Document', 'doc')
+        self.mirror = api.content.create(
+            self.portal, 'mirror', 'mirror', master=self.master
+        )
+        self.other = api.content.create(self.portal, 'Folder', 'other')
+
+    def paths(self):
+        return {term.value.getPath() for term in CatalogVocabularyFactory()(self.portal)}
+
+    def test_mirrored_content_excluded(self):
+        self.assertEqual(self.paths(), {'/plone/master', '/plone/other'})
+
+    def test_content_selectable_after_detaching(self):
+        self.mirror.master = None
+        self.assertIn('/plone/master/inner', self.paths())
+
+    def test_content_not_woken_when_detaching(self):
+        with mock.patch(
+            'collective.mirror.mirror.get_objects', wraps=get_objects
+        ) as get:
+            self.mirror.master = None
+        for call in get.call_args_list:
+            self.assertEqual({brain.portal_type for brain in call.args[0]}, {'mirror'})
+
+    def test_nested_master_stays_mirrored(self):
+        api.content.create(self.inner, 'Folder', 'sub')
+        api.content.create(self.portal, 'mirror', 'mirror2', master=self.inner)
+        self.mirror.master = None
+        self.assertEqual(
+            self.paths(), {'/plone/master', '/plone/master/inner', '/plone/other'}
+        )
+
+    def test_content_excluded_after_attaching(self):
+        api.content.create(self.portal, 'mirror', 'mirror2', master=self.other)
+        api.content.create(self.other, 'Folder', 'sub')
+        self.assertEqual(self.paths(), {'/plone/master', '/plone/other'})
+
+    def test_limited(self):
+        for i in range(3):
+            api.content.create(self.portal, 'Folder', f'folder{i}')
+        with mock.patch('collective.mirror.vocabularies.MAX_RESULTS', 2):
+            self.assertEqual(len(self.paths()), 2)
+
+    def test_not_limited_when_searching(self):
+        for i in range(3):
+            api.content.create(self.portal, 'Folder', f'folder{i}')
+        query = {
+            'criteria': [
+                {
+                    'i': 'portal_type',
+                    'o': 'plone.app.querystring.operation.selection.any',
+                    'v': ['Folder'],
+                }
+            ]
+        }
+        with mock.patch('collective.mirror.vocabularies.MAX_RESULTS', 2):
+            vocabulary = CatalogVocabularyFactory()(self.portal, query)
+            self.assertEqual(len(vocabulary), 5)
+
+    def test_master_term(self):
+        vocabulary = CatalogVocabularyFactory()(self.portal)
+        self.assertIn(IUUID(self.master), vocabulary)
+        self.assertIn(self.master, vocabulary)
+        self.assertNotIn(IUUID(self.master['doc']), vocabulary)
+
+    def test_mirrored_master_term(self):
+        # An existing mirror's master nested in another mirrored tree stays valid.
+        mirror = api.content.create(self.portal, 'mirror', 'mirror2', master=self.inner)
+        vocabulary = CatalogVocabularyFactory()(self.portal)
+        self.assertNotIn('/plone/master/inner', self.paths())
+        self.assertIn(IUUID(mirror.master), vocabulary)
+
+    def test_master_term_beyond_limit(self):
+        with mock.patch('collective.mirror.vocabularies.MAX_RESULTS', 1):
+            vocabulary = CatalogVocabularyFactory()(self.portal)
+            self.assertEqual(len(vocabulary), 1)
+            self.assertIn(IUUID(self.other), vocabulary)
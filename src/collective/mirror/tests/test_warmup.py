@@ -0,0 +1,51 @@
+"""Tests for warming up mirrored content at process start."""
+from BTrees.OOBTree import OOBTree
+from collective.mirror.testing import COLLECTIVE_MIRROR_INTEGRATION_TESTING
+from collective.mirror.warmup import warm_up
+from collective.mirror.warmup import warm_up_btree
+from collective.mirror.warmup import warm_up_site
+from plone import api
+from plone.app.testing import setRoles
+from plone.app.testing import TEST_USER_ID
+from unittest import mock
+
+import unittest
+
+
+class TestWarmUp(unittest.TestCase):
+
+    layer = COLLECTIVE_MIRROR_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.master = api.content.create(self.portal, 'Folder', 'master')
+        api.content.create(self.master, 'Document', 'doc')
+        for i in range(2):
+            api.content.create(self.portal, 'mirror', f'mirror{i}', master=self.master)
+        api.content.create(self.portal, 'mirror', 'detached')
+
+    def test_warm_up_site(self):
+        self.assertEqual(warm_up_site(self.portal), (1, 2, 1))
+
+    def db(self, pool_size):
+        db = mock.Mock()
+        db.getPoolSize.return_value = pool_size
+        db.open.return_value.root.return_value = {'Application': self.layer['app']}
+        return db
+
+    def test_warm_up_all_connections(self):
+        db = self.db(2)
+        self.assertEqual(warm_up(db), (2, 4, 2))
+        self.assertEqual(db.open.return_value.close.call_count, 2)
+
+    def test_warm_up_no_connections(self):
+        self.assertEqual(warm_up(self.db(0)), (0, 0, 0))
+
+    def test_warm_up_btree_levels(self):
+        tree = OOBTree({str(i): i for i in range(10000)})
+        self.assertEqual(warm_up_btree(tree, 1), 1)
+        self.assertGreater(warm_up_btree(tree, 2), 1)
+
+    def test_warm_up_empty_btree(self):
+        self.assertEqual(warm_up_btree(OOBTree(), 2), 1)
@@ -0,0 +1,34 @@
+from .indexing import INDEXES_RECORD
+from .indexing import METADATA_RECORD
+from .mirror import MIRRORED_INDEX
+from plone import api
+from plone.registry.interfaces import IRegistry
+from zope.component import getUtility
+
+
+REGISTRY_RECORDS = (INDEXES_RECORD, METADATA_RECORD)
+
+
+def add_mirrored_index(context):
+    """Add the is_mirrored index and index all content in it."""
+    context.runImportStepFromProfile('profile-collective.mirror:default', 'catalog')
+    cat = api.portal.get_tool('portal_catalog')
+    cat.manage_reindexIndex(ids=[MIRRORED_INDEX])
+
+
+def add_registry_records(context):
+    """Add the registry records for mirrored indexes and metadata.
+
+    Importing the registry resets records to the profile's values, so values already
+    set on sites that have some of the records are restored afterwards.
+
+    """
+    registry = getUtility(IRegistry)
+    values = {
+        name: registry[name] for name in REGISTRY_RECORDS if name in registry.records
+    }
+    context.runImportStepFromProfile(
+        'profile-collective.mirror:default', 'plone.app.registry'
+    )
+    for name, value in values.items():
+        registry[name] = value
@@ -0,0 +1,59 @@
+from .mirror import MASTER_TYPES
+from .mirror import MIRRORED_INDEX
+from functools import lru_cache
+from plone.uuid.interfaces import IUUID
+from zope.interface import implementer
+from zope.schema.interfaces import IVocabularyFactory
+
+
+# Upper bound of the number of terms when browsing without search criteria, which is
+# also plone.app.content's maximum batch size for vocabulary lookups.
+MAX_RESULTS = 500
+
+
+@implementer(IVocabularyFactory)
+class CatalogVocabularyFactory:
+    """Like plone.app.vocabularies.catalog.CatalogVocabularyFactory but without navroot
+
+    The vocabulary is meant for picking master folders, so it is always restricted to
+    the types that may be masters and its terms exclude mirrors and content inside
+    mirrored trees, using the is_mirrored index. Results are sorted by the catalog,
+    which pages through them lazily as the picker asks for batches, and limited when
+    browsing without search criteria.
+
+    Membership only checks the type: an existing mirror's master may since have
+    become mirrored itself or sort after the limit, and saving the mirror must still
+    validate.
+
+    """
+
+    def __call__(self, context, query=None):
+        # Deferred so that loading our configuration doesn't import the vocabularies.
+        from plone.app.vocabularies.utils import parseQueryString
+
+        parsed = {}
+        if query:
+            parsed = parseQueryString(context, query['criteria'])
+            if 'sort_on' in query:
+                parsed['sort_on'] = query['sort_on']
+            if 'sort_order' in query:
+                parsed['sort_order'] = str(query['sort_order'])
+
+        if not parsed:
+            parsed['sort_limit'] = MAX_RESULTS
+        parsed['portal_type'] = list(MASTER_TYPES)
+        parsed[MIRRORED_INDEX] = False
+        parsed.setdefault('sort_on', 'sortable_title')
+        return _vocabulary_class().fromItems(parsed, context)
+
+
+@lru_cache(maxsize=None)
+def _vocabulary_class():
+    from plone.app.vocabularies.catalog import CatalogVocabulary
+
+    class MasterVocabulary(CatalogVocabulary):
+        def __contains__(self, value):
+            uid = value if isinstance(value, str) else IUUID(value)
+            return len(self.catalog(UID=uid, portal_type=list(MASTER_TYPES))) > 0
+
+    return MasterVocabulary
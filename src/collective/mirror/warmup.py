@@ -0,0 +1,118 @@
+"""Opt-in warm-up of mirror topology and master trees at process start.
+
+Set the environment variable COLLECTIVE_MIRROR_WARMUP to enable it, and
+COLLECTIVE_MIRROR_WARMUP_DEPTH to the number of levels of each master's content tree to
+load (2 by default).
+
+"""
+
+from .mirror import attached_mirrors
+from logging import getLogger
+from persistent import Persistent
+from plone import api
+from Products.CMFPlone.interfaces import IPloneSiteRoot
+from Testing.makerequest import makerequest
+from zope.component.hooks import getSite
+from zope.component.hooks import setSite
+
+import os
+import time
+import transaction
+import Zope2
+
+
+logger = getLogger(__name__)
+
+WARMUP_ENV = 'COLLECTIVE_MIRROR_WARMUP'
+
+DEPTH_ENV = 'COLLECTIVE_MIRROR_WARMUP_DEPTH'
+
+DEFAULT_DEPTH = 2
+
+
+def warm_up_on_start(event):
+    if not os.environ.get(WARMUP_ENV):
+        return
+
+    depth = int(os.environ.get(DEPTH_ENV, DEFAULT_DEPTH))
+    start = time.time()
+    try:
+        masters, mirrors, nodes = warm_up(Zope2.DB, depth)
+    except Exception:
+        logger.exception('Warming up mirrored content failed.')
+        return
+    logger.info(
+        'Warmed up %s masters, %s mirrors and %s tree nodes in %.2f seconds.',
+        masters,
+        mirrors,
+        nodes,
+        time.time() - start,
+    )
+
+
+def warm_up(db, depth=DEFAULT_DEPTH):
+    """Load mirrors, masters and their trees into all pooled connections' caches.
+
+    Each worker thread uses its own connection from the pool, so all of them are opened
+    at the same time and warmed up in turn. Return the numbers of masters, mirrors and
+    tree nodes loaded, summed over all connections.
+
+    """
+    connections = [db.open() for i in range(db.getPoolSize())]
+    counts = [0, 0, 0]
+    try:
+        for connection in connections:
+            app = makerequest(connection.root()['Application'])
+            for site in app.objectValues():
+                if IPloneSiteRoot.providedBy(site):
+                    for i, count in enumerate(warm_up_site(site, depth)):
+                        counts[i] += count
+    finally:
+        transaction.abort()
+        for connection in connections:
+            connection.close()
+    return tuple(counts)
+
+
+def warm_up_site(site, depth=DEFAULT_DEPTH):
+    """Load a site's mirrors and masters, including the top levels of master trees.
+
+    Return the numbers of masters, mirrors and tree nodes loaded.
+
+    """
+    old_site = getSite()
+    setSite(site)
+    try:
+        cat = api.portal.get_tool('portal_catalog')
+        masters = {}
+        for brain in cat.unrestrictedSearchResults(portal_type='mirror'):
+            if (master := brain._unrestrictedGetObject().master) is not None:
+                masters[master._p_oid] = master
+
+        mirrors = nodes = 0
+        for master in masters.values():
+            mirrors += len(attached_mirrors(master))
+            nodes += warm_up_btree(master._tree, depth)
+    finally:
+        setSite(old_site)
+    return len(masters), mirrors, nodes
+
+
+def warm_up_btree(tree, depth):
+    """Load the top levels of a BTree, return the number of nodes loaded."""
+    nodes = [tree]
+    loaded = 0
+    for level in range(depth):
+        children = []
+        for node in nodes:
+            if not isinstance(node, Persistent):
+                continue
+            node._p_activate()
+            loaded += 1
+            state = node.__getstate__()
+            if state is not None:
+                # Internal nodes hold children alternating with keys; small trees hold
+                # their only bucket's data inline instead.
+                children.extend(state[0][::2])
+        nodes = children
+    return loaded